@@ -0,0 +1,71 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+# Runs the commands that reduce an expression to its functional support on
+# deeply nested input, read from a file as the command line tool would. Two
+# chains of the given depth combined by XOR exceed the recursion limit many
+# times over, but their function only has two minterms, so every command has
+# to finish quickly and print the expected result.
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+def deep_chain(leaf, depth):
+	text = leaf
+	for level in range(depth):
+		text = f"(E (C + {text}) D)" if ((level % 2) == 0) else f"(F + {text})"
+	return text
+
+def fail(text):
+	print(text, file = sys.stderr)
+	sys.exit(1)
+
+parser = argparse.ArgumentParser(description = "Check that the command line tool handles deeply nested expressions.")
+parser.add_argument("-d", "--depth", metavar = "depth", type = int, action = "append", help = "Depth of the nested chains. Can be given multiple times. Defaults to 500 and 4000.")
+args = parser.parse_args(sys.argv[1:])
+
+root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+minimal = "-A B -C D E -F + A -B -C D E -F"
+checks = [
+	("qmc", [ "qmc", "@expression" ], 0, minimal),
+	("canonicalize", [ "canonicalize", "@expression" ], 0, minimal),
+	("canonicalize -m bdd", [ "canonicalize", "-m", "bdd", "@expression" ], 0, minimal),
+	("equal", [ "equal", "@expression", minimal ], 0, "Expressions equal."),
+	("equal -m bdd, differing", [ "equal", "-m", "bdd", "@expression", "-A B -C D E -F" ], 1, "Not equal: {'A': 1, 'B': 0, 'C': 0, 'D': 1, 'E': 1, 'F': 0} gives 1 on LHS but 0 on RHS"),
+]
+
+with tempfile.TemporaryDirectory() as tmpdir:
+	filename = os.path.join(tmpdir, "expression.txt")
+	for depth in (args.depth or (500, 4000)):
+		with open(filename, "w") as f:
+			print(f"{deep_chain('A', depth)} ^ {deep_chain('B', depth)}", file = f)
+		for (name, cmdargs, expected_returncode, expected_output) in checks:
+			cmdargs = [ f"@{filename}" if (arg == "@expression") else arg for arg in cmdargs ]
+			t0 = time.perf_counter()
+			result = subprocess.run([ sys.executable, "-m", "digtool" ] + cmdargs, cwd = root, stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+			duration = time.perf_counter() - t0
+			if (result.returncode != expected_returncode) or (result.stdout.decode().strip() != expected_output):
+				fail(f"{name} on chains of depth {depth} returned {result.returncode}: {(result.stdout + result.stderr).decode().strip()[-500:]}")
+			print(f"{name:<28s} depth {depth:5d}: {duration * 1000:6.0f}ms")
@@ -0,0 +1,80 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+# Compares the tpg-generated expression parser against the hand-written
+# fast parser on a corpus of generated expressions of increasing size.
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from digtool.ExpressionParser import parse_expression
+
+def generate_sop(rng, var_count, term_count):
+	varnames = [ f"V{i}" for i in range(var_count) ]
+	terms = [ ]
+	for i in range(term_count):
+		terms.append(" ".join(f"{'-' if (rng.random() < 0.5) else ''}{varname}" for varname in varnames))
+	return " + ".join(terms)
+
+def generate_nested(rng, var_count, depth):
+	if (depth == 0) or (rng.random() < 0.1):
+		return rng.choice([ f"V{i}" for i in range(var_count) ] + [ "0", "1" ])
+	choice = rng.random()
+	if choice < 0.15:
+		return "!" + generate_nested(rng, var_count, depth - 1)
+	elif choice < 0.3:
+		return "(" + generate_nested(rng, var_count, depth - 1) + ")"
+	op = rng.choice([ " + ", " * ", " ^ ", " @ ", " # ", " " ])
+	return generate_nested(rng, var_count, depth - 1) + op + generate_nested(rng, var_count, depth - 1)
+
+def benchmark(text, backend, runs):
+	best = None
+	for i in range(runs):
+		t0 = time.perf_counter()
+		result = parse_expression(text, backend = backend)
+		duration = time.perf_counter() - t0
+		best = duration if (best is None) else min(best, duration)
+	return (best, str(result))
+
+parser = argparse.ArgumentParser(description = "Benchmark the tpg and fast expression parser backends against each other.")
+parser.add_argument("-s", "--seed", type = int, default = 1, help = "Seed for generating the corpus. Defaults to %(default)d.")
+parser.add_argument("-r", "--runs", metavar = "count", type = int, default = 3, help = "Number of runs per expression, the best one counts. Defaults to %(default)d.")
+args = parser.parse_args(sys.argv[1:])
+
+rng = random.Random(args.seed)
+corpus = [ ]
+for term_count in (10, 100, 1000, 10000):
+	corpus.append((f"SOP, 16 variables, {term_count} terms", generate_sop(rng, 16, term_count)))
+for depth in (8, 12, 16):
+	corpus.append((f"nested, depth {depth}", generate_nested(rng, 8, depth)))
+
+print(f"{'Expression':<40s} {'Length':>10s} {'tpg':>10s} {'fast':>10s} {'Speedup':>8s}")
+for (name, text) in corpus:
+	(tpg_time, tpg_result) = benchmark(text, "tpg", args.runs)
+	(fast_time, fast_result) = benchmark(text, "fast", args.runs)
+	if tpg_result != fast_result:
+		print(f"{name}: backends disagree on the parsed expression", file = sys.stderr)
+		sys.exit(1)
+	print(f"{name:<40s} {len(text):10d} {tpg_time * 1000:8.1f}ms {fast_time * 1000:8.1f}ms {tpg_time / fast_time:7.1f}x")
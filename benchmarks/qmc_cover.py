@@ -0,0 +1,133 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+# Checks and times the covering step of the Quine-McCluskey method on charts
+# with a cyclic core, i.e., charts that have no essential implicants and no
+# dominated minterms or implicants left after reduction. Small charts are
+# checked against an exhaustive search for the minimum cover, a chain of
+# cycles checks that deep searches work, and random functions of 10 and 12
+# variables show how long the search takes until it finishes or exceeds a
+# node budget. Without the budget, the search for a minimum cover of the
+# larger ones takes minutes.
+
+import os
+import sys
+import time
+import random
+import argparse
+import itertools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from digtool.ExpressionParser import parse_expression
+from digtool.QuineMcCluskey import QuineMcCluskey
+
+def chart_from_covers(covers, row_count):
+	covering = [ 0 ] * row_count
+	for (index, covered) in enumerate(covers):
+		for row in range(row_count):
+			if (covered >> row) & 1:
+				covering[row] |= 1 << index
+	return covering
+
+def cycle_chain(cycle_count, cycle_length):
+	# Each cycle of minterms is covered by the implicants that cover two
+	# neighboring minterms, and needs half of them, rounded up
+	covers = [ ]
+	for cycle in range(cycle_count):
+		offset = cycle * cycle_length
+		for position in range(cycle_length):
+			covers.append((1 << (offset + position)) | (1 << (offset + (position + 1) % cycle_length)))
+	return (covers, cycle_count * cycle_length, cycle_count * ((cycle_length + 1) // 2))
+
+def random_chart(rng, row_count, column_count, density):
+	covers = [ sum(1 << row for row in range(row_count) if rng.random() < density) for index in range(column_count) ]
+	for row in range(row_count):
+		if not any((covered >> row) & 1 for covered in covers):
+			covers[rng.randrange(column_count)] |= 1 << row
+	return covers
+
+def exhaustive_minimum(covers, row_count):
+	for count in range(len(covers) + 1):
+		for selection in itertools.combinations(covers, count):
+			covered = 0
+			for implicant_covers in selection:
+				covered |= implicant_covers
+			if covered == (1 << row_count) - 1:
+				return count
+
+def is_cover(covers, row_count, selection):
+	covered = 0
+	for index in selection:
+		covered |= covers[index]
+	return covered == (1 << row_count) - 1
+
+def random_function(rng, var_count, minterm_count):
+	varnames = [ f"V{i}" for i in range(var_count) ]
+	terms = [ ]
+	for minterm in sorted(rng.sample(range(1 << var_count), minterm_count)):
+		terms.append(" ".join(f"{'' if ((minterm >> (var_count - 1 - varno)) & 1) else '-'}{varname}" for (varno, varname) in enumerate(varnames)))
+	return " + ".join(terms)
+
+def fail(text):
+	print(text, file = sys.stderr)
+	sys.exit(1)
+
+parser = argparse.ArgumentParser(description = "Check and benchmark the Quine-McCluskey cover search on charts with a cyclic core.")
+parser.add_argument("-s", "--seed", type = int, default = 1, help = "Seed for generating the charts and functions. Defaults to %(default)d.")
+parser.add_argument("-c", "--charts", metavar = "count", type = int, default = 500, help = "Number of small random charts checked against an exhaustive search. Defaults to %(default)d.")
+parser.add_argument("-b", "--budget", metavar = "nodes", type = int, default = 20000, help = "Node budget of the cover search for the random functions, 0 searches until a minimum cover is found. Defaults to %(default)d.")
+args = parser.parse_args(sys.argv[1:])
+rng = random.Random(args.seed)
+
+# The classic cyclic function: every minterm is covered by two of the six
+# prime implicants, and every other one of them forms a minimum cover
+solution = QuineMcCluskey(parse_expression("-A -B -C + -A -B C + -A B -C + A -B C + A B -C + A B C")).optimize()
+if solution != "-A -B + B -C + A C":
+	fail(f"Cyclic function of three variables minimized to {solution}")
+print(f"Cyclic function of three variables: {solution}")
+
+for i in range(args.charts):
+	(row_count, column_count) = (rng.randint(1, 14), rng.randint(1, 12))
+	covers = random_chart(rng, row_count, column_count, rng.uniform(0.1, 0.5))
+	(selection, minimal) = QuineMcCluskey(None)._minimum_cover(covers, chart_from_covers(covers, row_count))
+	if (not minimal) or (not is_cover(covers, row_count, selection)) or (len(selection) != exhaustive_minimum(covers, row_count)):
+		fail(f"Cover {selection} of {covers} is not a minimum cover")
+print(f"{args.charts} random charts: all minimum covers")
+
+for (cycle_count, cycle_length) in ((700, 3), (200, 5)):
+	(covers, row_count, expected) = cycle_chain(cycle_count, cycle_length)
+	t0 = time.perf_counter()
+	(selection, minimal) = QuineMcCluskey(None)._minimum_cover(covers, chart_from_covers(covers, row_count))
+	duration = time.perf_counter() - t0
+	if (not minimal) or (not is_cover(covers, row_count, selection)) or (len(selection) != expected):
+		fail(f"{cycle_count} cycles of {cycle_length}: {len(selection)} implicants instead of {expected}")
+	print(f"{cycle_count} cycles of {cycle_length} minterms: {len(selection)} implicants in {duration * 1000:.0f}ms")
+
+print(f"{'Function':<32s} {'Terms':>6s} {'Time':>9s}  Cover")
+for (var_count, minterm_count) in ((10, 200), (10, 500), (12, 1500)):
+	expression = parse_expression(random_function(rng, var_count, minterm_count))
+	qmc = QuineMcCluskey(expression, cover_budget = args.budget or None)
+	t0 = time.perf_counter()
+	solution = qmc.optimize()
+	duration = time.perf_counter() - t0
+	if parse_expression(solution).truth_vector(expression.variables) != expression.truth_vector():
+		fail(f"Solution for {var_count} variables, {minterm_count} minterms differs from the function")
+	print(f"{f'{var_count} variables, {minterm_count} minterms':<32s} {solution.count(' + ') + 1:6d} {duration * 1000:7.0f}ms  {'minimal' if qmc._cover_minimal else 'budget exceeded'}")
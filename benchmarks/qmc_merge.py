@@ -0,0 +1,93 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+# Compares the strategies for merging implicants in the Quine-McCluskey
+# method on random functions of 12 to 16 variables: comparing all pairs of
+# implicants against looking up the merge partner of every implicant for
+# each of its free bits. Only the merging phase is timed. The last column
+# relates the automatic choice to the faster of the two fixed strategies.
+
+import gc
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from digtool.ExpressionParser import parse_expression
+from digtool.QuineMcCluskey import QuineMcCluskey
+
+def generate_sop(rng, var_count, term_count, literal_count):
+	varnames = [ f"V{i}" for i in range(var_count) ]
+	terms = [ ]
+	for i in range(term_count):
+		terms.append(" ".join(f"{'-' if (rng.random() < 0.5) else ''}{varname}" for varname in rng.sample(varnames, literal_count)))
+	return " + ".join(terms)
+
+def generate_random_function(rng, var_count, density):
+	varnames = [ f"V{i}" for i in range(var_count) ]
+	terms = [ ]
+	for minterm in range(1 << var_count):
+		if rng.random() < density:
+			terms.append(" ".join(f"{'' if ((minterm >> (var_count - 1 - varno)) & 1) else '-'}{varname}" for (varno, varname) in enumerate(varnames)))
+	return " + ".join(terms)
+
+def benchmark(expression, merge_strategy, runs):
+	best = None
+	for i in range(runs):
+		qmc = QuineMcCluskey(expression, merge_strategy = merge_strategy)
+		prime_implicants = qmc._create_prime_implicants(qmc._group_by_bitcount(expression.minterm_indices()))
+		# Garbage collections triggered by the previous runs would otherwise
+		# be charged to whichever strategy happens to run next.
+		gc.collect()
+		gc.disable()
+		t0 = time.perf_counter()
+		all_implicants = qmc._create_merged_implicant_groups(prime_implicants)
+		duration = time.perf_counter() - t0
+		gc.enable()
+		best = duration if (best is None) else min(best, duration)
+	implicants = sorted(implicant for groups in qmc._discard_mask_information(all_implicants).values() for implicant in groups)
+	return (best, implicants)
+
+parser = argparse.ArgumentParser(description = "Benchmark the pairwise and lookup based merging of Quine-McCluskey implicants against each other.")
+parser.add_argument("-s", "--seed", type = int, default = 1, help = "Seed for generating the functions. Defaults to %(default)d.")
+parser.add_argument("-r", "--runs", metavar = "count", type = int, default = 5, help = "Number of runs per function, the best one counts. Defaults to %(default)d.")
+args = parser.parse_args(sys.argv[1:])
+
+rng = random.Random(args.seed)
+corpus = [ ]
+for var_count in (12, 14, 16):
+	for (term_count, literal_count) in ((8, var_count - 2), (32, var_count - 4), (16, var_count // 2)):
+		corpus.append((f"{var_count} variables, {term_count} terms of {literal_count}", parse_expression(generate_sop(rng, var_count, term_count, literal_count))))
+for (var_count, density) in ((12, 0.05), (12, 0.25), (13, 0.25), (14, 0.1)):
+	corpus.append((f"{var_count} variables, {density * 100:.0f}% minterms", parse_expression(generate_random_function(rng, var_count, density))))
+
+print(f"{'Function':<32s} {'Minterms':>8s} {'Implicants':>10s} {'pairwise':>10s} {'lookup':>10s} {'auto':>10s} {'Speedup':>8s} {'vs. best':>8s}")
+for (name, expression) in corpus:
+	(pairwise_time, pairwise_result) = benchmark(expression, "pairwise", args.runs)
+	(lookup_time, lookup_result) = benchmark(expression, "lookup", args.runs)
+	(auto_time, auto_result) = benchmark(expression, None, args.runs)
+	if not (pairwise_result == lookup_result == auto_result):
+		print(f"{name}: strategies disagree on the implicants", file = sys.stderr)
+		sys.exit(1)
+	minterm_count = sum(1 for minterm in expression.minterm_indices())
+	print(f"{name:<32s} {minterm_count:8d} {len(pairwise_result):10d} {pairwise_time * 1000:8.1f}ms {lookup_time * 1000:8.1f}ms {auto_time * 1000:8.1f}ms {pairwise_time / auto_time:7.1f}x {auto_time / min(pairwise_time, lookup_time):7.2f}x")
@@ -0,0 +1,88 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+# Checks and times the algebraic simplification pass. Random nested
+# expressions must keep their truth table, and the operands of commutative
+# operators given in reverse order must simplify to the very same node. Deep
+# chains as siblings of one operator check that ordering their operands does
+# not recurse.
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from digtool.ExpressionParser import parse_expression, NodeFactory
+
+def generate_nested(rng, var_count, depth):
+	# Returns the expression and the same one with all operands of its
+	# commutative operators in reverse order
+	if (depth == 0) or (rng.random() < 0.1):
+		leaf = rng.choice([ f"V{i}" for i in range(var_count) ] + [ "0", "1" ])
+		return (leaf, leaf)
+	choice = rng.random()
+	if choice < 0.15:
+		(text, reversed_text) = generate_nested(rng, var_count, depth - 1)
+		return (f"!({text})", f"!({reversed_text})")
+	op = rng.choice([ " + ", " * ", " ^ ", " " ])
+	(lhs, reversed_lhs) = generate_nested(rng, var_count, depth - 1)
+	(rhs, reversed_rhs) = generate_nested(rng, var_count, depth - 1)
+	return (f"({lhs}){op}({rhs})", f"({reversed_rhs}){op}({reversed_lhs})")
+
+def deep_chain(leaf, depth):
+	text = leaf
+	for level in range(depth):
+		text = f"(E (C + {text}) D)" if ((level % 2) == 0) else f"(F + {text})"
+	return text
+
+def fail(text):
+	print(text, file = sys.stderr)
+	sys.exit(1)
+
+parser = argparse.ArgumentParser(description = "Check and benchmark the algebraic simplification of expressions.")
+parser.add_argument("-s", "--seed", type = int, default = 1, help = "Seed for generating the expressions. Defaults to %(default)d.")
+parser.add_argument("-e", "--expressions", metavar = "count", type = int, default = 2000, help = "Number of random expressions to check. Defaults to %(default)d.")
+args = parser.parse_args(sys.argv[1:])
+rng = random.Random(args.seed)
+
+t0 = time.perf_counter()
+for i in range(args.expressions):
+	(text, reversed_text) = generate_nested(rng, 5, rng.randint(2, 8))
+	factory = NodeFactory()
+	expression = parse_expression(text, factory = factory)
+	simplified = expression.simplify(factory = factory)
+	if simplified.truth_vector(expression.variables) != expression.truth_vector():
+		fail(f"Simplification of {text} changed its function to {simplified}")
+	reversed_simplified = parse_expression(reversed_text, factory = factory).simplify(factory = factory)
+	if reversed_simplified.expr is not simplified.expr:
+		fail(f"{text} simplified to {simplified}, but {reversed_text} to {reversed_simplified}")
+print(f"{args.expressions} random expressions: {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+for depth in (500, 4000):
+	expression = parse_expression(f"{deep_chain('A', depth)} ^ {deep_chain('B', depth)}")
+	t0 = time.perf_counter()
+	simplified = expression.simplify()
+	duration = time.perf_counter() - t0
+	if simplified.truth_vector(expression.variables) != expression.truth_vector():
+		fail(f"Simplification of sibling chains of depth {depth} changed their function")
+	print(f"Sibling chains of depth {depth}: {expression.node_count} nodes to {simplified.node_count} in {duration * 1000:.0f}ms")
@@ -0,0 +1,71 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+# Measures the wall-clock startup cost of "python -m digtool parse A" before
+# and after the grammar cache: the very same command is run once in a
+# checkout of the revision that preceded the cache, in which tpg translated
+# the grammar on every import, and once in the working tree.
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+def measure(runs, cmd, root):
+	env = dict(os.environ)
+	env.pop("DIGTOOL_NO_GRAMMAR_CACHE", None)
+	env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+	# Warm up the OS caches and create the bytecode caches if necessary.
+	subprocess.run(cmd, cwd = root, env = env, stdout = subprocess.DEVNULL, check = True)
+
+	durations = [ ]
+	for i in range(runs):
+		t0 = time.perf_counter()
+		subprocess.run(cmd, cwd = root, env = env, stdout = subprocess.DEVNULL, check = True)
+		durations.append(time.perf_counter() - t0)
+	return durations
+
+def git(root, *args):
+	return subprocess.run([ "git", *args ], cwd = root, stdout = subprocess.PIPE, check = True).stdout
+
+parser = argparse.ArgumentParser(description = "Benchmark the startup time of digtool before and after the grammar cache.")
+parser.add_argument("-b", "--before", metavar = "revision", help = "Git revision to compare the working tree against. Defaults to the parent of the commit that added the grammar cache.")
+parser.add_argument("-n", "--runs", metavar = "count", type = int, default = 20, help = "Number of runs per configuration. Defaults to %(default)d.")
+args = parser.parse_args(sys.argv[1:])
+
+root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+before = args.before
+if before is None:
+	before = git(root, "log", "--diff-filter=A", "--format=%H", "--", "digtool/GrammarCache.py").decode().split()[-1] + "^"
+before = git(root, "rev-parse", "--short", before).decode().strip()
+
+cmd = [ sys.executable, "-m", "digtool", "parse", "A" ]
+print("Startup time of: python -m digtool parse A")
+with tempfile.TemporaryDirectory() as before_root:
+	archive = git(root, "archive", before)
+	subprocess.run([ "tar", "-x", "-C", before_root ], input = archive, check = True)
+	for (name, tree) in ((f"before ({before})", before_root), ("after (working tree)", root)):
+		durations = measure(args.runs, cmd, tree)
+		print(f"{name:<24s} median {statistics.median(durations) * 1000:6.1f} ms   min {min(durations) * 1000:6.1f} ms")
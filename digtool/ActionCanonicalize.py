@@ -20,33 +20,74 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 from .BaseAction import BaseAction
-from .ExpressionParser import parse_expression
 
 class ActionCanonicalize(BaseAction):
+	def _expand_indices(self, reduced, term_indices):
+		# Row indices over all variables, in ascending order and without
+		# collecting them. The reduced function is evaluated over all
+		# variables up to the least significant one it depends on, the
+		# dropped ones among them simply being free. Less significant
+		# dropped variables take either value in every row.
+		variables = self._expr.variables
+		support = set(reduced.variables)
+		evaluated_count = max((varno + 1 for (varno, varname) in enumerate(variables) if varname in support), default = 0)
+		trailing_count = len(variables) - evaluated_count
+		for index in term_indices(variables[ : evaluated_count]):
+			base = index << trailing_count
+			for trailing in range(1 << trailing_count):
+				yield base | trailing
+
 	def run(self):
-		self._expr = parse_expression(self._args.expression)
+		self._expr = self._parse_expression(self._args.expression)
+
+		match self._args.method:
+			case "table":
+				# Evaluate only the functional support; variables that the
+				# function does not depend on are put back when the terms are
+				# printed.
+				reduced = self._expr.reduce_support()
+				minterm_indices = lambda: self._expand_indices(reduced, reduced.minterm_indices)
+				maxterm_indices = lambda: self._expand_indices(reduced, reduced.maxterm_indices)
+
+			case "bdd":
+				# Terms are the paths to the one (or zero) terminal, expanded
+				# over the variables they skip
+				function = self._expr.bdd()
+				minterm_indices = lambda: function.manager.minterm_indices(function.edge)
+				maxterm_indices = lambda: function.manager.minterm_indices(function.manager.negate(function.edge))
+				if self._args.verbose >= 1:
+					# Counted on the diagram, without enumerating the terms
+					minterm_count = function.manager.satcount(function.edge)
+					if not self._args.ccnf:
+						print(f"Minterms: {minterm_count}")
+					else:
+						print(f"Maxterms: {(1 << len(self._expr.variables)) - minterm_count}")
+
+			case _:
+				raise NotImplementedError(self._args.method)
 
+		# Terms are printed as they are enumerated
 		if not self._args.ccnf:
-			minterms = [ ]
-			for minterm in self._expr.minterms():
+			separator = ""
+			for index in minterm_indices():
 				minterm_str = [ ]
-				for varname in self._expr.variables:
-					if minterm[varname]:
+				for (varname, value) in zip(self._expr.variables, self._expr.row_values(index)):
+					if value:
 						minterm_str.append(f"{varname}")
 					else:
 						minterm_str.append(f"-{varname}")
 				minterm_str = " ".join(minterm_str)
-				minterms.append(minterm_str)
-			print(" + ".join(minterms))
+				print(f"{separator}{minterm_str}", end = "")
+				separator = " + "
+			print()
 		else:
-			maxterms = [ ]
-			for maxterm in self._expr.maxterms():
+			for index in maxterm_indices():
 				maxterm_str = [ ]
-				for varname in self._expr.variables:
-					if maxterm[varname]:
+				for (varname, value) in zip(self._expr.variables, self._expr.row_values(index)):
+					if value:
 						maxterm_str.append(f"-{varname}")
 					else:
 						maxterm_str.append(f"{varname}")
 				maxterm_str = "(" + " + ".join(maxterm_str) + ")"
-				maxterms.append(maxterm_str)
-			print("".join(maxterms))
+				print(maxterm_str, end = "")
+			print()
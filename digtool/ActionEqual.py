@@ -20,12 +20,168 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 from .BaseAction import BaseAction
-from .ExpressionParser import parse_expression
+from .PRNG import PRNG
+from .ExpressionParser import NodeFactory, Operator, ParsedExpression, reduce_common_support, disjoint_components
 
 class ActionEqual(BaseAction):
+	_SIMULATION_ROWS = 1 << 14
+	_CONFIDENCE = 0.95
+
+	def _components_equal(self, expr1, expr2, factory):
+		# Two ORs of components over the same disjoint sets of variables are
+		# equal iff they agree on every component, unless a component is
+		# constant one (dually for AND and constant zero). This proves
+		# equality with 2^a + 2^b instead of 2^(a + b) evaluations. Any
+		# difference is left to the complete comparison, which reports the
+		# lowest differing row.
+		(op, components) = disjoint_components([ expr1, expr2 ], factory = factory)
+		if op is None:
+			return False
+		(dominated1, dominated2, equal) = (False, False, True)
+		for (component1, component2) in components:
+			(dominating1, dominating2, component_equal) = self._compare_component(component1, component2, op)
+			dominated1 = dominated1 or dominating1
+			dominated2 = dominated2 or dominating2
+			equal = equal and component_equal
+		if dominated1 or dominated2:
+			return dominated1 and dominated2
+		return equal
+
+	def _compare_component(self, component1, component2, op):
+		# Streams both components block by block and determines whether
+		# either is constantly the dominating value and whether both are
+		# equal. Stops as soon as none of this can hold anymore.
+		(dominating1, dominating2, equal) = (True, True, True)
+		for (block1, block2) in zip(component1.blocks(), component2.blocks(component1.variables)):
+			value = ((1 << block1.row_count) - 1) if (op == Operator.Or) else 0
+			dominating1 = dominating1 and (block1.vector == value)
+			dominating2 = dominating2 and (block2.vector == value)
+			equal = equal and (block1.vector == block2.vector)
+			if not (dominating1 or dominating2 or equal):
+				break
+		return (dominating1, dominating2, equal)
+
+	def _evaluated_difference(self, dominant_expr, subordinate_expr, factory):
+		# Only the functional support of both expressions is compared.
+		# Variables that neither depends on are zero in a counterexample,
+		# which therefore still is the lowest differing row.
+		(dominant_reduced, subordinate_reduced) = reduce_common_support([ dominant_expr, subordinate_expr ], factory = factory)
+		if (dominant_reduced.expr is subordinate_reduced.expr) or self._components_equal(dominant_reduced, subordinate_reduced, factory):
+			return None
+
+		if (self._args.method == "table") and (self._args.jobs > 1):
+			# Only import multiprocessing when it is actually used
+			from .ShardedComparison import ShardedComparison
+			index = ShardedComparison(dominant_reduced, subordinate_reduced, jobs = self._args.jobs).first_difference()
+			differences = [ ] if (index is None) else [ (index, 1) ]
+		elif self._args.method == "table":
+			differences = ((dominant_block.offset, dominant_block.vector ^ subordinate_block.vector) for (dominant_block, subordinate_block) in zip(dominant_reduced.blocks(), subordinate_reduced.blocks()))
+		else:
+			# Shannon expansion of the miter, i.e., the XOR of both
+			# expressions. Subspaces in which both cofactors are the very
+			# same node cancel out and are not evaluated at all.
+			miter = ParsedExpression(factory.nary(Operator.Xor, [ dominant_reduced.expr, subordinate_reduced.expr ]), variables = dominant_reduced.variables)
+			differences = ((block.offset, block.vector) for block in miter.blocks(shannon_expansion = True))
+
+		for (offset, difference) in differences:
+			if difference != 0:
+				# First row (lowest index) that differs
+				index = (difference & -difference).bit_length() - 1
+				assignment = dominant_reduced.assignment(offset + index)
+				return { varname: assignment.get(varname, 0) for varname in dominant_expr.variables }
+		return None
+
+	def _bdd_difference(self, dominant_expr, subordinate_expr):
+		# With the same variable order, BDDs of equal functions are the very
+		# same edge. Otherwise, the lowest minterm of their XOR is the lowest
+		# differing row. Nothing is enumerated, so this works for many more
+		# variables than evaluating the table.
+		from .BDD import BDD
+		manager = BDD(dominant_expr.variables)
+		difference = manager.xor(dominant_expr.bdd(manager).edge, subordinate_expr.bdd(manager).edge)
+		if difference == manager.ZERO:
+			return None
+		return dominant_expr.assignment(next(manager.minterm_indices(difference)))
+
+	def _miter(self, dominant_expr, subordinate_expr):
+		# CNF that is satisfiable exactly by the assignments for which both
+		# expressions differ. The variables of the expressions come first, in
+		# their order, followed by the auxiliary variables of the encoding.
+		from .CNF import CNF
+		cnf = CNF()
+		for varname in dominant_expr.variables:
+			cnf.variable(varname)
+		lhs = cnf.encode(dominant_expr.expr)
+		rhs = cnf.encode(subordinate_expr.expr)
+		cnf.add_clause([ lhs, rhs ])
+		cnf.add_clause([ -lhs, -rhs ])
+		return cnf
+
+	def _sat_difference(self, dominant_expr, subordinate_expr):
+		from .SATSolver import SATSolver
+		cnf = self._miter(dominant_expr, subordinate_expr)
+		solver = SATSolver(cnf.variable_count)
+		for clause in cnf.clauses:
+			solver.add_clause(clause)
+		if not solver.solve():
+			return None
+
+		# Any model is a counterexample. To report the lowest differing row
+		# like the other methods, fix the variables from the most significant
+		# one on to zero wherever the miter remains satisfiable.
+		variables = [ cnf.varnames[varname] for varname in dominant_expr.variables ]
+		model = [ solver.value(variable) for variable in variables ]
+		assumptions = [ ]
+		for (position, variable) in enumerate(variables):
+			if model[position] and solver.solve(assumptions + [ -variable ]):
+				model = [ solver.value(variable) for variable in variables ]
+			assumptions.append(variable if model[position] else -variable)
+		return { varname: int(value) for (varname, value) in zip(dominant_expr.variables, model) }
+
+	def _simulated_difference(self, dominant_expr, subordinate_expr, prng, row_count):
+		# Evaluates both expressions on row_count random rows at once: each
+		# variable is a word with one random bit per row.
+		variables = dominant_expr.variables
+		bytecount = (row_count + 7) // 8
+		one = (1 << row_count) - 1
+		words = [ int.from_bytes(prng.get_bytes(bytecount), byteorder = "little") & one for varname in variables ]
+		difference = dominant_expr.compile(variables)(*words, one = one) ^ subordinate_expr.compile(variables)(*words, one = one)
+		if difference == 0:
+			return None
+		row = (difference & -difference).bit_length() - 1
+		return { varname: (word >> row) & 1 for (varname, word) in zip(variables, words) }
+
+	def _approximate_difference(self, dominant_expr, subordinate_expr, prng, row_count):
+		for offset in range(0, row_count, self._SIMULATION_ROWS):
+			value_dict = self._simulated_difference(dominant_expr, subordinate_expr, prng, min(self._SIMULATION_ROWS, row_count - offset))
+			if value_dict is not None:
+				return value_dict
+		return None
+
+	def _difference(self, dominant_expr, subordinate_expr, factory):
+		match self._args.method:
+			case "table" | "cofactor":
+				return self._evaluated_difference(dominant_expr, subordinate_expr, factory)
+
+			case "bdd":
+				return self._bdd_difference(dominant_expr, subordinate_expr)
+
+			case "sat":
+				return self._sat_difference(dominant_expr, subordinate_expr)
+
+			case _:
+				raise NotImplementedError(self._args.method)
+
 	def run(self):
-		expr1 = parse_expression(self._args.expression1)
-		expr2 = parse_expression(self._args.expression2)
+		if (self._args.jobs > 1) and (self._args.method != "table"):
+			print(f"Parallel evaluation with {self._args.jobs} jobs is only supported by the \"table\" method, not by \"{self._args.method}\".")
+			return 2
+
+		# Both expressions share one node factory so that structurally
+		# identical expressions end up as the very same node.
+		factory = NodeFactory()
+		expr1 = self._parse_expression(self._args.expression1, factory = factory)
+		expr2 = self._parse_expression(self._args.expression2, factory = factory)
 
 		e1_vars = set(expr1.variables)
 		e2_vars = set(expr2.variables)
@@ -42,13 +198,36 @@ class ActionEqual(BaseAction):
 			# expr2 has more variables
 			(dominant_expr, subordinate_expr) = (expr2, expr1)
 
-		eq = True
-		for (value_dict, eval1) in dominant_expr.table():
-			eval2 = subordinate_expr.expr.evaluate(value_dict)
-			if eval1 != eval2:
-				eq = False
-				print(f"Not equal: {value_dict} gives {eval1} on LHS but {eval2} on RHS")
-				return 1
-		if eq:
+		if self._args.dimacs is not None:
+			with open(self._args.dimacs, "w") as f:
+				self._miter(dominant_expr, subordinate_expr).write_dimacs(f)
+
+		if expr1.expr is expr2.expr:
+			print("Expressions equal.")
+			return 0
+
+		prng = PRNG((self._args.random_seed or "digtool").encode("utf-8"))
+		if (self._args.approximate is not None) and (self._args.approximate < dominant_expr.state_count):
+			# Random rows only: if the expressions differ on a fraction p of
+			# all rows, n random rows miss that with probability (1 - p)^n.
+			value_dict = self._approximate_difference(dominant_expr, subordinate_expr, prng, self._args.approximate)
+			if value_dict is None:
+				bound = 1 - (1 - self._CONFIDENCE) ** (1 / self._args.approximate)
+				print(f"No difference found on {self._args.approximate} random inputs. With {100 * self._CONFIDENCE:.0f}% confidence, the expressions differ on less than {100 * bound:.2g}% of all inputs.")
+				return 0
+		else:
+			# Expressions that differ usually do so on many rows, which random
+			# simulation finds long before any complete comparison does.
+			value_dict = None
+			if dominant_expr.state_count > self._SIMULATION_ROWS:
+				value_dict = self._approximate_difference(dominant_expr, subordinate_expr, prng, self._SIMULATION_ROWS)
+			if value_dict is None:
+				value_dict = self._difference(dominant_expr, subordinate_expr, factory)
+
+		if value_dict is None:
 			print("Expressions equal.")
 			return 0
+		eval1 = dominant_expr.expr.evaluate(value_dict)
+		eval2 = subordinate_expr.expr.evaluate(value_dict)
+		print(f"Not equal: {value_dict} gives {eval1} on LHS but {eval2} on RHS")
+		return 1
@@ -20,12 +20,11 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 from .BaseAction import BaseAction
-from .ExpressionParser import parse_expression
 from .ExpressionFormatter import ExpressionFormatterText, ExpressionFormatterTex
 
 class ActionParse(BaseAction):
 	def run(self):
-		expr = parse_expression(self._args.expression)
+		expr = self._parse_expression(self._args.expression)
 		match self._args.format:
 			case "text":
 				print(ExpressionFormatterText(expr, implicit_and = not self._args.no_implicit_and))
@@ -20,19 +20,27 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 from .BaseAction import BaseAction
-from .ExpressionParser import parse_expression
+from .ExpressionParser import reduce_common_support
 from .QuineMcCluskey import QuineMcCluskey
 
 class ActionQMC(BaseAction):
 	def run(self):
-		expression = parse_expression(self._args.expression)
+		expression = self._parse_expression(self._args.expression)
 		if self._args.verbose >= 3:
 			print(f"Expression: {self._args.expression}")
 		if self._args.dc_expression is not None:
-			dc_expression = parse_expression(self._args.dc_expression)
+			dc_expression = self._parse_expression(self._args.dc_expression)
 		else:
 			dc_expression = None
 
-		qmc = QuineMcCluskey(expression, dc_expression, verbosity = self._args.verbose)
+		# Minimization only needs the variables the function (or the don't
+		# care set) actually depends on, the others never appear in a prime
+		# implicant.
+		if dc_expression is None:
+			expression = expression.reduce_support()
+		else:
+			(expression, dc_expression) = reduce_common_support([ expression, dc_expression ])
+
+		qmc = QuineMcCluskey(expression, dc_expression, verbosity = self._args.verbose, cover_budget = self._args.budget)
 		solution = qmc.optimize()
 		print(solution)
@@ -20,24 +20,54 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 from .BaseAction import BaseAction
-from .ExpressionParser import parse_expression
 from .Table import Table
 
 class ActionTable(BaseAction):
+	def _minterm_rows(self):
+		# Rows that evaluate to one, enumerated from a BDD instead of
+		# evaluating all rows of the table
+		from .BDD import BDD
+		manager = BDD(self._expr.variables)
+		edge = self._expr.bdd(manager).edge
+		if self._dc_expr is not None:
+			edge = manager.and_(edge, manager.negate(self._dc_expr.bdd(manager).edge))
+		for index in manager.minterm_indices(edge):
+			yield (self._expr.row_values(index), 1)
+
 	def _table(self):
-		for (var_dict, evaluation) in self._expr.table():
-			if (self._dc_expr is None) or (self._dc_expr.expr.evaluate(var_dict) == 0):
-				yield (var_dict, evaluation)
+		# Rows are (values, evaluation) tuples, values being ordered like the
+		# expression's variables.
+		if self._args.only_ones:
+			yield from self._minterm_rows()
+			return
+
+		if self._args.gray_code:
+			table = self._expr.gray_rows()
+		else:
+			table = self._expr.rows()
+
+		if self._dc_expr is None:
+			yield from table
+			return
+
+		if self._args.gray_code:
+			dc_fnc = self._dc_expr.compile(self._expr.variables)
+			table = ((values, evaluation, dc_fnc(*values)) for (values, evaluation) in table)
+		else:
+			table = ((values, evaluation, dc_evaluation) for ((values, evaluation), dc_evaluation) in zip(table, self._dc_expr.evaluations(self._expr.variables)))
+		for (values, evaluation, dc_evaluation) in table:
+			if dc_evaluation == 0:
+				yield (values, evaluation)
 			else:
-				yield (var_dict, "*")
+				yield (values, "*")
 
 	def _coltable(self):
 		rows = [ ]
 		for i in range(len(self._expr.variables) + 1):
 			rows.append([ ])
-		for (var_dict, evaluation) in self._table():
-			for (varno, varname) in enumerate(self._expr.variables):
-				rows[varno].append(var_dict[varname])
+		for (values, evaluation) in self._table():
+			for (varno, value) in enumerate(values):
+				rows[varno].append(value)
 			rows[-1].append(evaluation)
 		yield from zip(self._expr.variables, rows)
 		yield (None, rows[-1])
@@ -51,14 +81,14 @@ class ActionTable(BaseAction):
 		sep_row = end + end.join([ sep ] * cols) + end
 		print(hdr_row)
 		print(sep_row)
-		for (var_dict, evaluation) in self._table():
-			val_row = end + end.join(f" {var_dict[varname]:<{self._maxlen}} " for varname in list(self._expr.variables)) + end + f" {evaluation:<{self._maxlen}} " + end
+		for (values, evaluation) in self._table():
+			val_row = end + end.join(f" {value:<{self._maxlen}} " for value in values) + end + f" {evaluation:<{self._maxlen}} " + end
 			print(val_row)
 
 	def _print_table(self):
 		print("\t".join(varname for varname in self._expr.variables))
-		for (var_dict, evaluation) in self._table():
-			line = [ str(var_dict[varname]) for varname in self._expr.variables ]
+		for (values, evaluation) in self._table():
+			line = [ str(value) for value in values ]
 			line.append(str(evaluation))
 			print("\t".join(line))
 
@@ -108,19 +138,19 @@ class ActionTable(BaseAction):
 				inverted = (gc & (1 << (y_var_cnt - 1 - no))) == 0
 				table.set(y_var_cnt - 1 - no, x_var_cnt + y, f"{'!' if inverted else ''}{varname}")
 
-		for (var_dict, evaluation) in self._table():
+		for (values, evaluation) in self._table():
 			if (evaluation == 0) and (not self._args.kv_show_zeros):
 				continue
 
 			x_gc = 0
-			for (no, x_var) in enumerate(x_vars):
-				if var_dict[x_var]:
+			for (no, value) in enumerate(values[ : x_var_cnt]):
+				if value:
 					x_gc |= 1 << (x_var_cnt - 1 - no)
 			x = _inv_gray_code(x_gc)
 
 			y_gc = 0
-			for (no, y_var) in enumerate(y_vars):
-				if var_dict[y_var]:
+			for (no, value) in enumerate(values[x_var_cnt : ]):
+				if value:
 					y_gc |= 1 << (y_var_cnt - 1 - no)
 			y = _inv_gray_code(y_gc)
 
@@ -129,9 +159,9 @@ class ActionTable(BaseAction):
 		table.print()
 
 	def run(self):
-		self._expr = parse_expression(self._args.expression)
+		self._expr = self._parse_expression(self._args.expression)
 		if self._args.dc_expression is not None:
-			self._dc_expr = parse_expression(self._args.dc_expression)
+			self._dc_expr = self._parse_expression(self._args.dc_expression)
 		else:
 			self._dc_expr = None
 		self._maxlen = max(len(varname) for varname in self._expr.variables)
@@ -0,0 +1,258 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import collections
+from .ExpressionParser import Operator, Variable, Constant, UnaryOperator
+
+class BDD():
+	# Reduced ordered binary decision diagrams with complement edges. An edge
+	# is an integer whose least significant bit marks it as complemented and
+	# whose remaining bits are the index of the node it points to. Node 0 is
+	# the terminal, so edge 0 is constant one and edge 1 is constant zero.
+	# The "then" edge of a node is never complemented, which makes the
+	# representation canonical: equivalent functions are the very same edge.
+	# Results of ITE operations are memoized in a direct-mapped cache in
+	# which colliding entries simply evict each other.
+	Function = collections.namedtuple("Function", [ "manager", "edge" ])
+	ONE = 0
+	ZERO = 1
+
+	def __init__(self, variables, cache_bits = 18):
+		self._variables = tuple(variables)
+		self._levels = { varname: level for (level, varname) in enumerate(self._variables) }
+		self._node_level = [ len(self._variables) ]
+		self._node_high = [ None ]
+		self._node_low = [ None ]
+		self._unique = { }
+		self._cache_mask = (1 << cache_bits) - 1
+		self._cache_keys = [ None ] * (1 << cache_bits)
+		self._cache_values = [ None ] * (1 << cache_bits)
+
+	@property
+	def variables(self):
+		return self._variables
+
+	def __len__(self):
+		return len(self._node_level)
+
+	def level(self, edge):
+		return self._node_level[edge >> 1]
+
+	def _node(self, level, high, low):
+		if high == low:
+			return high
+		# Keep the "then" edge regular by complementing the whole node
+		complement = high & 1
+		if complement:
+			(high, low) = (high ^ 1, low ^ 1)
+		key = (level, high, low)
+		index = self._unique.get(key)
+		if index is None:
+			index = len(self._node_level)
+			self._node_level.append(level)
+			self._node_high.append(high)
+			self._node_low.append(low)
+			self._unique[key] = index
+		return (index << 1) | complement
+
+	def _cofactors(self, edge, level):
+		index = edge >> 1
+		if self._node_level[index] != level:
+			return (edge, edge)
+		complement = edge & 1
+		return (self._node_high[index] ^ complement, self._node_low[index] ^ complement)
+
+	def variable(self, varname):
+		return self._node(self._levels[varname], self.ONE, self.ZERO)
+
+	def constant(self, value):
+		return self.ONE if value else self.ZERO
+
+	def ite(self, f, g, h):
+		# Iterative, with an explicit stack, so that the depth of the diagram
+		# is not limited by the recursion limit. A call of three edges pushes
+		# the calls for both cofactors below a join entry of four values,
+		# which combines their results once both are on the result stack.
+		(ONE, ZERO) = (self.ONE, self.ZERO)
+		(cache_keys, cache_values, cache_mask) = (self._cache_keys, self._cache_values, self._cache_mask)
+		node_level = self._node_level
+		results = [ ]
+		stack = [ (f, g, h) ]
+		while len(stack) > 0:
+			entry = stack.pop()
+			if len(entry) == 4:
+				(key, slot, level, complement) = entry
+				low = results.pop()
+				high = results.pop()
+				result = self._node(level, high, low)
+				cache_keys[slot] = key
+				cache_values[slot] = result
+				results.append(result ^ complement)
+				continue
+
+			# Terminal cases, then normalization of the argument triple so
+			# that equivalent calls share a cache entry: f and g are made
+			# regular.
+			(f, g, h) = entry
+			if f == ONE:
+				results.append(g)
+				continue
+			elif f == ZERO:
+				results.append(h)
+				continue
+			if f & 1:
+				(f, g, h) = (f ^ 1, h, g)
+			if g == f:
+				g = ONE
+			elif g == f ^ 1:
+				g = ZERO
+			if h == f:
+				h = ZERO
+			elif h == f ^ 1:
+				h = ONE
+			if g == h:
+				results.append(g)
+				continue
+			elif (g == ONE) and (h == ZERO):
+				results.append(f)
+				continue
+			elif (g == ZERO) and (h == ONE):
+				results.append(f ^ 1)
+				continue
+			complement = g & 1
+			if complement:
+				(g, h) = (g ^ 1, h ^ 1)
+
+			key = (f, g, h)
+			slot = hash(key) & cache_mask
+			if cache_keys[slot] == key:
+				results.append(cache_values[slot] ^ complement)
+				continue
+
+			level = min(node_level[f >> 1], node_level[g >> 1], node_level[h >> 1])
+			(f_high, f_low) = self._cofactors(f, level)
+			(g_high, g_low) = self._cofactors(g, level)
+			(h_high, h_low) = self._cofactors(h, level)
+			stack.append((key, slot, level, complement))
+			stack.append((f_low, g_low, h_low))
+			stack.append((f_high, g_high, h_high))
+		return results[0]
+
+	def negate(self, f):
+		return f ^ 1
+
+	def and_(self, f, g):
+		return self.ite(f, g, self.ZERO)
+
+	def or_(self, f, g):
+		return self.ite(f, self.ONE, g)
+
+	def xor(self, f, g):
+		return self.ite(f, g ^ 1, g)
+
+	def build(self, node):
+		# Post-order over the expression DAG, each distinct node converted
+		# once
+		edges = { }
+		stack = [ (node, False) ]
+		while len(stack) > 0:
+			(element, children_done) = stack.pop()
+			if id(element) in edges:
+				continue
+			elif not children_done:
+				stack.append((element, True))
+				stack += ((child, False) for child in element.children)
+				continue
+
+			operands = [ edges[id(child)] for child in element.children ]
+			if isinstance(element, Variable):
+				edge = self.variable(element.varname)
+			elif isinstance(element, Constant):
+				edge = self.constant(element.value)
+			elif isinstance(element, UnaryOperator):
+				edge = self.negate(operands[0])
+			else:
+				match element.op:
+					case Operator.Or | Operator.Nor:
+						edge = self.ZERO
+						for operand in operands:
+							edge = self.or_(edge, operand)
+					case Operator.And | Operator.Nand:
+						edge = self.ONE
+						for operand in operands:
+							edge = self.and_(edge, operand)
+					case Operator.Xor:
+						edge = self.ZERO
+						for operand in operands:
+							edge = self.xor(edge, operand)
+					case _:
+						raise NotImplementedError(element.op)
+				if element.op in (Operator.Nand, Operator.Nor):
+					edge = self.negate(edge)
+			edges[id(element)] = edge
+		return edges[id(node)]
+
+	def satcount(self, f):
+		# Number of satisfying assignments over all variables of the manager.
+		# Counts of regular nodes are memoized, children before their parents;
+		# those of complemented edges follow from the number of assignments
+		# below the node.
+		counts = { 0: 1 }
+		def scaled(edge, level):
+			index = edge >> 1
+			node_level = self._node_level[index]
+			result = counts[index]
+			if edge & 1:
+				result = (1 << (len(self._variables) - node_level)) - result
+			return result << (node_level - level)
+
+		stack = [ f >> 1 ]
+		while len(stack) > 0:
+			index = stack[-1]
+			if index in counts:
+				stack.pop()
+				continue
+			(high, low) = (self._node_high[index], self._node_low[index])
+			pending = [ child >> 1 for child in (high, low) if (child >> 1) not in counts ]
+			if len(pending) > 0:
+				stack += pending
+				continue
+			stack.pop()
+			node_level = self._node_level[index]
+			counts[index] = scaled(high, node_level + 1) + scaled(low, node_level + 1)
+		return scaled(f, 0)
+
+	def minterm_indices(self, f):
+		# Depth-first walk that takes the zero branch first, so minterms are
+		# generated in ascending order. Variables skipped by an edge branch
+		# into both values with the very same edge.
+		varcount = len(self._variables)
+		stack = [ (f, 0, 0) ]
+		while len(stack) > 0:
+			(edge, level, prefix) = stack.pop()
+			if edge == self.ZERO:
+				continue
+			elif level == varcount:
+				yield prefix
+				continue
+			(high, low) = self._cofactors(edge, level)
+			stack.append((high, level + 1, (prefix << 1) | 1))
+			stack.append((low, level + 1, prefix << 1))
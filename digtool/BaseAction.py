@@ -19,10 +19,21 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+from .ExpressionParser import parse_expression_argument
+
 class BaseAction():
 	def __init__(self, cmd, args):
 		self._cmd = cmd
 		self._args = args
 
+	def _parse_expression(self, argument, factory = None):
+		expression = parse_expression_argument(argument, factory = factory)
+		if self._args.simplify:
+			simplified = expression.simplify(factory = factory)
+			if self._args.verbose >= 1:
+				print(f"Simplification reduced {expression.node_count} nodes to {simplified.node_count} nodes.")
+			expression = simplified
+		return expression
+
 	def run(self):
 		raise NotImplementedError()
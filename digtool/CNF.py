@@ -0,0 +1,129 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+from .ExpressionParser import Operator, Variable, Constant, UnaryOperator
+
+class CNF():
+	# Formula in conjunctive normal form with DIMACS conventions: variables
+	# are numbered starting at one, a literal is a variable or its
+	# negation. Expressions are added by their Tseitin encoding, in which
+	# every operator node gets an auxiliary variable that is constrained to
+	# be equivalent to it.
+	def __init__(self):
+		self._variable_count = 0
+		self._clauses = [ ]
+		self._varnames = { }
+		self._true = None
+		self._literals = { }
+
+	@property
+	def variable_count(self):
+		return self._variable_count
+
+	@property
+	def clauses(self):
+		return self._clauses
+
+	@property
+	def varnames(self):
+		return self._varnames
+
+	def new_variable(self):
+		self._variable_count += 1
+		return self._variable_count
+
+	def variable(self, varname):
+		if varname not in self._varnames:
+			self._varnames[varname] = self.new_variable()
+		return self._varnames[varname]
+
+	def constant(self, value):
+		if self._true is None:
+			self._true = self.new_variable()
+			self.add_clause([ self._true ])
+		return self._true if value else -self._true
+
+	def add_clause(self, literals):
+		self._clauses.append(list(literals))
+
+	def _and(self, operands):
+		output = self.new_variable()
+		for operand in operands:
+			self.add_clause([ -output, operand ])
+		self.add_clause([ output ] + [ -operand for operand in operands ])
+		return output
+
+	def _xor(self, lhs, rhs):
+		output = self.new_variable()
+		self.add_clause([ -output, lhs, rhs ])
+		self.add_clause([ -output, -lhs, -rhs ])
+		self.add_clause([ output, -lhs, rhs ])
+		self.add_clause([ output, lhs, -rhs ])
+		return output
+
+	def encode(self, node):
+		# Returns the literal that is equivalent to the expression. Nodes
+		# shared within or across encoded expressions are encoded only once
+		# (the node is kept alongside so that its id remains unique); OR,
+		# NAND and NOR are ANDs with negated inputs and/or output.
+		literals = self._literals
+		stack = [ (node, False) ]
+		while len(stack) > 0:
+			(element, children_done) = stack.pop()
+			if id(element) in literals:
+				continue
+			elif not children_done:
+				stack.append((element, True))
+				stack += ((child, False) for child in element.children)
+				continue
+
+			operands = [ literals[id(child)][1] for child in element.children ]
+			if isinstance(element, Variable):
+				literal = self.variable(element.varname)
+			elif isinstance(element, Constant):
+				literal = self.constant(element.value)
+			elif isinstance(element, UnaryOperator):
+				literal = -operands[0]
+			else:
+				match element.op:
+					case Operator.And:
+						literal = self._and(operands)
+					case Operator.Nand:
+						literal = -self._and(operands)
+					case Operator.Or:
+						literal = -self._and([ -operand for operand in operands ])
+					case Operator.Nor:
+						literal = self._and([ -operand for operand in operands ])
+					case Operator.Xor:
+						literal = operands[0]
+						for operand in operands[1:]:
+							literal = self._xor(literal, operand)
+					case _:
+						raise NotImplementedError(element.op)
+			literals[id(element)] = (element, literal)
+		return literals[id(node)][1]
+
+	def write_dimacs(self, f):
+		for (varname, variable) in sorted(self._varnames.items(), key = lambda item: item[1]):
+			print(f"c var {variable} {varname}", file = f)
+		print(f"p cnf {self._variable_count} {len(self._clauses)}", file = f)
+		for clause in self._clauses:
+			print(" ".join(str(literal) for literal in clause) + " 0", file = f)
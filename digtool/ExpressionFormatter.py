@@ -19,7 +19,33 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
-from .ExpressionParser import Operator, Variable, Constant, UnaryOperator, BinaryOperator
+import collections
+from .ExpressionParser import Operator, Variable, Constant, UnaryOperator, BinaryOperator, NaryOperator
+
+def _format_bottom_up(expr, fmt_node):
+	# Format every distinct node once, children before their parents, so
+	# that deeply nested expressions do not recurse. Each node is formatted
+	# from the strings of its children, which are dropped once all of their
+	# parents have used them.
+	postorder = list(expr)
+	pending_uses = collections.Counter(id(child) for element in postorder for child in element.children)
+	results = { }
+	for element in postorder:
+		operands = [ ]
+		for child in element.children:
+			operands.append(results[id(child)])
+			pending_uses[id(child)] -= 1
+			if pending_uses[id(child)] == 0:
+				del results[id(child)]
+		results[id(element)] = fmt_node(element, operands)
+	return results[id(expr.expr)]
+
+def _parenthesize(expr, operand, parent):
+	# A binary operation needs parentheses unless its parent is the same
+	# operation or an OR of ANDs
+	if isinstance(expr, (BinaryOperator, NaryOperator)) and (parent.op != expr.op) and ((parent.op, expr.op) != (Operator.Or, Operator.And)):
+		return f"({operand})"
+	return operand
 
 class ExpressionFormatterTex():
 	def __init__(self, expr, neg_overline = True, implicit_and = True):
@@ -39,27 +65,23 @@ class ExpressionFormatterTex():
 	def _op(self, op):
 		return self._ops[op]
 
-	def _fmt(self, expr, prev = None):
+	def _fmt_node(self, expr, operands):
+		operands = [ _parenthesize(child, operand, expr) for (child, operand) in zip(expr.children, operands) ]
 		if isinstance(expr, Variable):
 			return f"\\textnormal{{{expr.varname}}}"
-		elif isinstance(expr, BinaryOperator):
-#			if prev is not None:
-#				print(prev.op, "*******", expr.op)
-			if (prev is None) or ((prev is not None) and ((prev.op == expr.op) or ((prev.op, expr.op) == (Operator.Or, Operator.And)))):
-				return f"{self._fmt(expr.lhs, expr)} {self._op(expr.op)} {self._fmt(expr.rhs, expr)}"
-			else:
-				return f"({self._fmt(expr.lhs, expr)} {self._op(expr.op)} {self._fmt(expr.rhs, expr)})"
+		elif isinstance(expr, (BinaryOperator, NaryOperator)):
+			return f" {self._op(expr.op)} ".join(operands)
 		elif isinstance(expr, UnaryOperator):
 			if self._neg_overline:
-				return f"\\overline{{{self._fmt(expr.rhs, expr)}}}"
+				return f"\\overline{{{operands[0]}}}"
 			else:
-				return f"{self._op(expr.op)} {self._fmt(expr.rhs, expr)}"
+				return f"{self._op(expr.op)} {operands[0]}"
 		elif isinstance(expr, Constant):
 			return str(expr)
 		raise NotImplementedError(expr)
 
 	def __str__(self):
-		return self._fmt(self._expr.expr)
+		return _format_bottom_up(self._expr, self._fmt_node)
 
 class ExpressionFormatterText():
 	def __init__(self, expr, neg_overline = True, implicit_and = True):
@@ -78,24 +100,20 @@ class ExpressionFormatterText():
 	def _op(self, op):
 		return self._ops[op]
 
-	def _fmt(self, expr, prev = None):
+	def _fmt_node(self, expr, operands):
+		operands = [ _parenthesize(child, operand, expr) for (child, operand) in zip(expr.children, operands) ]
 		if isinstance(expr, Variable):
 			return expr.varname
-		elif isinstance(expr, BinaryOperator):
-#			if prev is not None:
-#				print(prev.op, "*******", expr.op)
-			if (prev is None) or ((prev is not None) and ((prev.op == expr.op) or ((prev.op, expr.op) == (Operator.Or, Operator.And)))):
-				return f"{self._fmt(expr.lhs, expr)}{self._op(expr.op)}{self._fmt(expr.rhs, expr)}"
-			else:
-				return f"({self._fmt(expr.lhs, expr)}{self._op(expr.op)}{self._fmt(expr.rhs, expr)})"
+		elif isinstance(expr, (BinaryOperator, NaryOperator)):
+			return self._op(expr.op).join(operands)
 		elif isinstance(expr, UnaryOperator):
 			if isinstance(expr.rhs, Variable) or isinstance(expr.rhs, Constant):
-				return f"{self._op(expr.op)}{self._fmt(expr.rhs, expr)}"
+				return f"{self._op(expr.op)}{operands[0]}"
 			else:
-				return f"{self._op(expr.op)}({self._fmt(expr.rhs, expr)})"
+				return f"{self._op(expr.op)}({operands[0]})"
 		elif isinstance(expr, Constant):
 			return str(expr)
 		raise NotImplementedError(expr)
 
 	def __str__(self):
-		return self._fmt(self._expr.expr)
+		return _format_bottom_up(self._expr, self._fmt_node)
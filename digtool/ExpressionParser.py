@@ -19,34 +19,141 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+import sys
 import enum
 import functools
+import itertools
+import operator
+import collections
 from . import tpg
 
-class Operator(enum.Enum):
-	Or = "+"
-	And = "*"
-	Xor = "^"
-	Not = "!"
-	Nand = "@"
-	Nor = "#"
+_NUMPY_MIN_VARIABLES = 12
+
+@functools.cache
+def _numpy():
+	# NumPy is optional and takes longer to import than all of digtool, so
+	# it is only imported once a truth table is large enough to benefit.
+	try:
+		import numpy
+	except ImportError:
+		return None
+	return numpy
+
+class Operator(enum.IntEnum):
+	Or = 0
+	And = 1
+	Xor = 2
+	Not = 3
+	Nand = 4
+	Nor = 5
+
+	@property
+	def symbol(self):
+		return _OPERATOR_SYMBOLS[self]
 
 	@classmethod
 	def lookup(cls, value):
-		return {
-			"+":	cls.Or,
-			"|":	cls.Or,
-			"*":	cls.And,
-			"&":	cls.And,
-			"^":	cls.Xor,
-			"!":	cls.Not,
-			"-":	cls.Not,
-			"~":	cls.Not,
-			"@":	cls.Nand,
-			"#":	cls.Nor,
-		}[value]
-
-class Variable():
+		if isinstance(value, cls):
+			return value
+		return _OPERATOR_LOOKUP[value]
+
+_OPERATOR_SYMBOLS = {
+	Operator.Or:	"+",
+	Operator.And:	"*",
+	Operator.Xor:	"^",
+	Operator.Not:	"!",
+	Operator.Nand:	"@",
+	Operator.Nor:	"#",
+}
+
+_OPERATOR_LOOKUP = {
+	"+":	Operator.Or,
+	"|":	Operator.Or,
+	"*":	Operator.And,
+	"&":	Operator.And,
+	"^":	Operator.Xor,
+	"!":	Operator.Not,
+	"-":	Operator.Not,
+	"~":	Operator.Not,
+	"@":	Operator.Nand,
+	"#":	Operator.Nor,
+}
+
+# Operand value that decides an operation on its own, together with the
+# result it then has
+_SHORT_CIRCUIT = {
+	Operator.Or:	(1, 1),
+	Operator.And:	(0, 0),
+	Operator.Nand:	(0, 1),
+	Operator.Nor:	(1, 0),
+}
+
+class Node():
+	__slots__ = ( )
+
+	@property
+	def children(self):
+		return ( )
+
+	def evaluate(self, var_dict):
+		# Explicit stack instead of recursion so that arbitrarily deep trees
+		# can be evaluated. Each stack entry collects the values of its
+		# children one at a time, so that the remaining children are skipped
+		# as soon as one operand decides the result. Nodes that are shared
+		# within a DAG are only evaluated once.
+		memo = { }
+		stack = [ (self, self.children, [ ]) ]
+		while True:
+			(node, children, operands) = stack[-1]
+			if len(operands) < len(children):
+				short_circuit = _SHORT_CIRCUIT.get(node.op) if (len(operands) > 0) else None
+				if (short_circuit is None) or (operands[-1] != short_circuit[0]):
+					child = children[len(operands)]
+					if id(child) in memo:
+						operands.append(memo[id(child)])
+					else:
+						stack.append((child, child.children, [ ]))
+					continue
+				value = short_circuit[1]
+			else:
+				value = node._apply(var_dict, *operands)
+			memo[id(node)] = value
+			stack.pop()
+			if len(stack) == 0:
+				return value
+			stack[-1][2].append(value)
+
+	def cofactor(self, assignment, factory):
+		# Substitute the assigned variables and constant-fold bottom-up.
+		# Shared nodes are rewritten only once and subtrees without any
+		# assigned variable are kept as they are.
+		memo = { }
+		stack = [ (self, False) ]
+		while len(stack) > 0:
+			(node, children_done) = stack.pop()
+			if id(node) in memo:
+				continue
+			elif children_done:
+				memo[id(node)] = node._cofactor(assignment, factory, *(memo[id(child)] for child in node.children))
+			else:
+				stack.append((node, True))
+				stack += ((child, False) for child in node.children)
+		return memo[id(self)]
+
+	def _fold(self, factory, constant, operand):
+		# Result of applying the operation to a constant and an operand,
+		# which is a constant, the operand itself or its negation.
+		(if_zero, if_one) = (self._FUNCTIONS[self._op](constant, 0), self._FUNCTIONS[self._op](constant, 1))
+		if if_zero == if_one:
+			return factory.constant(if_zero)
+		elif if_one == 1:
+			return operand
+		else:
+			return factory.unary(Operator.Not, operand)
+
+class Variable(Node):
+	__slots__ = ( "_varname", )
+
 	def __init__(self, varname):
 		self._varname = varname
 
@@ -54,13 +161,20 @@ class Variable():
 	def varname(self):
 		return self._varname
 
-	def evaluate(self, var_dict):
-		return var_dict[self.varname]
+	def _apply(self, var_dict):
+		return var_dict[self._varname]
+
+	def _cofactor(self, assignment, factory):
+		if self._varname in assignment:
+			return factory.constant(assignment[self._varname])
+		return self
 
 	def __str__(self):
 		return self.varname
 
-class Constant():
+class Constant(Node):
+	__slots__ = ( "_value", )
+
 	def __init__(self, value):
 		assert(value in (0, 1))
 		self._value = value
@@ -69,13 +183,18 @@ class Constant():
 	def value(self):
 		return self._value
 
-	def evaluate(self, var_dict):
-		return self.value
+	def _apply(self, var_dict):
+		return self._value
+
+	def _cofactor(self, assignment, factory):
+		return self
 
 	def __str__(self):
 		return str(self.value)
 
-class UnaryOperator():
+class UnaryOperator(Node):
+	__slots__ = ( "_op", "_rhs" )
+
 	def __init__(self, op, rhs):
 		self._op = Operator.lookup(op)
 		self._rhs = rhs
@@ -88,14 +207,35 @@ class UnaryOperator():
 	def rhs(self):
 		return self._rhs
 
-	def evaluate(self, var_dict):
+	@property
+	def children(self):
+		return (self._rhs, )
+
+	def _apply(self, var_dict, rhs):
 		assert(self._op == Operator.Not)
-		return int(not self.rhs.evaluate(var_dict))
+		return 1 ^ rhs
+
+	def _cofactor(self, assignment, factory, rhs):
+		if isinstance(rhs, Constant):
+			return factory.constant(1 ^ rhs.value)
+		elif rhs is self._rhs:
+			return self
+		return factory.unary(self._op, rhs)
 
 	def __repr__(self):
-		return f"{self.op.value}({self.rhs})"
+		return f"{self.op.symbol}({self.rhs})"
+
+class BinaryOperator(Node):
+	__slots__ = ( "_lhs", "_op", "_rhs" )
+
+	_FUNCTIONS = {
+		Operator.Or: lambda x, y: x | y,
+		Operator.And: lambda x, y: x & y,
+		Operator.Xor: lambda x, y: x ^ y,
+		Operator.Nand: lambda x, y: int(not (x & y)),
+		Operator.Nor: lambda x, y: int(not (x | y)),
+	}
 
-class BinaryOperator():
 	def __init__(self, lhs, op, rhs):
 		self._lhs = lhs
 		self._op = Operator.lookup(op)
@@ -113,23 +253,153 @@ class BinaryOperator():
 	def rhs(self):
 		return self._rhs
 
-	def evaluate(self, var_dict):
-		lhs = self.lhs.evaluate(var_dict)
-		rhs = self.rhs.evaluate(var_dict)
-		fnc = {
-			Operator.Or: lambda x, y: x | y,
-			Operator.And: lambda x, y: x & y,
-			Operator.Xor: lambda x, y: x ^ y,
-			Operator.Nand: lambda x, y: int(not (x & y)),
-			Operator.Nor: lambda x, y: int(not (x | y)),
-		}[self.op]
-		return fnc(lhs, rhs)
+	@property
+	def children(self):
+		return (self._lhs, self._rhs)
+
+	def _apply(self, var_dict, lhs, rhs):
+		return self._FUNCTIONS[self._op](lhs, rhs)
+
+	def _cofactor(self, assignment, factory, lhs, rhs):
+		if isinstance(lhs, Constant) and isinstance(rhs, Constant):
+			return factory.constant(self._FUNCTIONS[self._op](lhs.value, rhs.value))
+		elif isinstance(lhs, Constant):
+			return self._fold(factory, lhs.value, rhs)
+		elif isinstance(rhs, Constant):
+			return self._fold(factory, rhs.value, lhs)
+		elif (lhs is self._lhs) and (rhs is self._rhs):
+			return self
+		return factory.binary(lhs, self._op, rhs)
+
+	def __repr__(self):
+		return f"({self.lhs} {self.op.symbol} {self.rhs})"
+
+class NaryOperator(Node):
+	__slots__ = ( "_op", "_operands" )
+
+	_ASSOCIATIVE = frozenset([ Operator.Or, Operator.And, Operator.Xor ])
+	_FUNCTIONS = {
+		Operator.Or: operator.or_,
+		Operator.And: operator.and_,
+		Operator.Xor: operator.xor,
+	}
+
+	def __init__(self, op, operands):
+		self._op = Operator.lookup(op)
+		assert(self._op in self._ASSOCIATIVE)
+		self._operands = tuple(operands)
+
+	@property
+	def op(self):
+		return self._op
+
+	@property
+	def operands(self):
+		return self._operands
+
+	@property
+	def children(self):
+		return self._operands
+
+	def _apply(self, var_dict, *operands):
+		return functools.reduce(self._FUNCTIONS[self._op], operands)
+
+	def _cofactor(self, assignment, factory, *operands):
+		constants = [ operand.value for operand in operands if isinstance(operand, Constant) ]
+		if (len(constants) == 0) and all(new is old for (new, old) in zip(operands, self._operands)):
+			return self
+		operands = [ operand for operand in operands if not isinstance(operand, Constant) ]
+		if self._op == Operator.Xor:
+			# Operands are hash-consed, so pairs of the very same node
+			# cancel each other out.
+			operands = [ operand for (operand, count) in collections.Counter(operands).items() if (count % 2) == 1 ]
+		if len(operands) == 0:
+			return factory.constant(self._apply(None, *constants) if (len(constants) > 0) else 0)
+		operand = factory.nary(self._op, operands)
+		if len(constants) == 0:
+			return operand
+		return self._fold(factory, self._apply(None, *constants), operand)
 
 	def __repr__(self):
-		return f"({self.lhs} {self.op.value} {self.rhs})"
+		return "(" + f" {self.op.symbol} ".join(str(operand) for operand in self.operands) + ")"
+
+class NodeFactory():
+	# Hash-consing construction of nodes: structurally identical subtrees are
+	# created only once and then shared, turning the tree into a DAG. Since
+	# children are interned before their parents, a node's structure is fully
+	# identified by its operator and the identities of its children.
+	def __init__(self):
+		self._nodes = { }
+
+	def _intern(self, key, constructor, *args):
+		node = self._nodes.get(key)
+		if node is None:
+			node = constructor(*args)
+			self._nodes[key] = node
+		return node
+
+	def __len__(self):
+		return len(self._nodes)
+
+	def variable(self, varname):
+		return self._intern((Variable, varname), Variable, varname)
+
+	def constant(self, value):
+		return self._intern((Constant, value), Constant, value)
+
+	def unary(self, op, rhs):
+		op = Operator.lookup(op)
+		return self._intern((UnaryOperator, op, id(rhs)), UnaryOperator, op, rhs)
+
+	def binary(self, lhs, op, rhs):
+		op = Operator.lookup(op)
+		return self._intern((BinaryOperator, op, id(lhs), id(rhs)), BinaryOperator, lhs, op, rhs)
+
+	def nary(self, op, operands):
+		# Operands which are themselves the same associative operator (e.g.,
+		# from a parenthesized subexpression) are merged into this node.
+		op = Operator.lookup(op)
+		flat_operands = [ ]
+		for operand in operands:
+			if isinstance(operand, NaryOperator) and (operand.op == op):
+				flat_operands += operand.operands
+			else:
+				flat_operands.append(operand)
+		if len(flat_operands) == 1:
+			return flat_operands[0]
+		return self._intern((NaryOperator, op, tuple(id(operand) for operand in flat_operands)), NaryOperator, op, flat_operands)
+
+class OperatorChain():
+	# Collects a left-associative sequence of operations of equal precedence.
+	# Runs of the same associative operator become a single n-ary node.
+	def __init__(self, factory, operand):
+		self._factory = factory
+		self._op = None
+		self._operands = [ operand ]
+
+	@property
+	def node(self):
+		if self._op is None:
+			return self._operands[0]
+		elif self._op in NaryOperator._ASSOCIATIVE:
+			return self._factory.nary(self._op, self._operands)
+		else:
+			return self._factory.binary(self._operands[0], self._op, self._operands[1])
+
+	def append(self, op, operand):
+		op = Operator.lookup(op)
+		if (op == self._op) and (op in NaryOperator._ASSOCIATIVE):
+			self._operands.append(operand)
+		else:
+			self._operands = [ self.node, operand ]
+			self._op = op
 
 class ExpressionParser(tpg.Parser):
-	r"""
+	# The grammar is deliberately not the docstring, which would make tpg
+	# translate it on every import. GrammarCache installs the generated
+	# parser methods below instead, once the first parser is created, so
+	# that the default fast backend never loads it.
+	GRAMMAR = r"""
 		separator space '\s+';
 
 		token or_op     '[|+]';
@@ -139,36 +409,66 @@ class ExpressionParser(tpg.Parser):
 		token nor_op    '#';
 		token neg_op	'[!-]';
 		token const 	'[01]';
-		token variable  '[a-zA-Z_][a-zA-Z0-9_]*'		$ Variable
+		token variable  '[a-zA-Z_][a-zA-Z0-9_]*';
 
 		START/e ->
 				Expr/e
 		;
 
-		Expr/lhs -> Term/lhs ( or_op/op Term/rhs		$ lhs = BinaryOperator(lhs, op, rhs)
-					)*
+		Expr/e -> Term/lhs							$ chain = OperatorChain(self.factory, lhs)
+					( or_op/op Term/rhs			$ chain.append(op, rhs)
+					)*							$ e = chain.node
 		;
 
-		Term/lhs -> Atom/lhs ( and_op/op Atom/rhs		$ lhs = BinaryOperator(lhs, op, rhs)
-							| xor_op/op Atom/rhs		$ lhs = BinaryOperator(lhs, op, rhs)
-							| nand_op/op Atom/rhs		$ lhs = BinaryOperator(lhs, op, rhs)
-							| nor_op/op Atom/rhs		$ lhs = BinaryOperator(lhs, op, rhs)
-							| Atom/rhs					$ lhs = BinaryOperator(lhs, "*", rhs)
-					)*
+		Term/t -> Atom/lhs							$ chain = OperatorChain(self.factory, lhs)
+					( and_op/op Atom/rhs		$ chain.append(op, rhs)
+					| xor_op/op Atom/rhs		$ chain.append(op, rhs)
+					| nand_op/op Atom/rhs		$ chain.append(op, rhs)
+					| nor_op/op Atom/rhs		$ chain.append(op, rhs)
+					| Atom/rhs					$ chain.append("*", rhs)
+					)*							$ t = chain.node
 		;
 
 		Atom/a ->
-				variable/a
-			|	const/a					$ a = Constant(int(a))
-			|	neg_op/op Atom/a		$ a = UnaryOperator(op, a)
+				variable/a				$ a = self.factory.variable(a)
+			|	const/a					$ a = self.factory.constant(int(a))
+			|	neg_op/op Atom/a		$ a = self.factory.unary(op, a)
 			|   '\(' Expr/a '\)'
 		;
 
 	"""
 
+	_grammar_installed = False
+
+	def __init__(self, factory = None):
+		if not ExpressionParser._grammar_installed:
+			from .GrammarCache import GrammarCache
+			GrammarCache(ExpressionParser, ExpressionParser.GRAMMAR, globals()).install()
+			ExpressionParser._grammar_installed = True
+		self.factory = factory if (factory is not None) else NodeFactory()
+		super().__init__()
+
 class ParsedExpression():
-	def __init__(self, expr):
+	Block = collections.namedtuple("Block", [ "offset", "row_count", "vector" ])
+	_COMPILED_OPERATORS = {
+		Operator.Or: "{0} | {1}",
+		Operator.And: "{0} & {1}",
+		Operator.Xor: "{0} ^ {1}",
+		Operator.Nand: "one ^ ({0} & {1})",
+		Operator.Nor: "one ^ ({0} | {1})",
+	}
+	_COMPILED_NARY_OPERATORS = {
+		Operator.Or: "|",
+		Operator.And: "&",
+		Operator.Xor: "^",
+	}
+
+	def __init__(self, expr, variables = None):
+		# The variables can be given explicitly, e.g., to retain variables
+		# that a rewritten expression no longer depends on.
 		self._expr = expr
+		self._variables = tuple(variables) if (variables is not None) else None
+		self._compiled = { }
 
 	@property
 	def expr(self):
@@ -178,8 +478,14 @@ class ParsedExpression():
 	def state_count(self):
 		return 1 << len(self.variables)
 
+	@functools.cached_property
+	def node_count(self):
+		return len(self._postorder())
+
 	@functools.cached_property
 	def variables(self):
+		if self._variables is not None:
+			return self._variables
 		varnames = set()
 		for element in self:
 			if isinstance(element, Variable):
@@ -187,40 +493,466 @@ class ParsedExpression():
 		varnames = tuple(sorted(varnames))
 		return varnames
 
-	def _traverse(self, element):
-		yield element
-		if isinstance(element, UnaryOperator):
-			yield from self._traverse(element.rhs)
-		elif isinstance(element, BinaryOperator):
-			yield from self._traverse(element.lhs)
-			yield from self._traverse(element.rhs)
+	def _postorder(self):
+		# Every distinct node exactly once, children before their parents
+		result = [ ]
+		visited = set()
+		stack = [ (self._expr, False) ]
+		while len(stack) > 0:
+			(element, children_done) = stack.pop()
+			if children_done:
+				result.append(element)
+			elif id(element) not in visited:
+				visited.add(id(element))
+				stack.append((element, True))
+				stack += ((child, False) for child in reversed(element.children))
+		return result
+
+	def compile_source(self, variables):
+		# Emit straight-line code that assigns one temporary per operator node
+		# in post-order. Variables are passed as positional arguments named
+		# after their index so that variable names never clash with Python
+		# keywords. All operations are bitwise with "one" being the all-ones
+		# value, so the same code evaluates a single row (one = 1) or many
+		# rows at once when every argument is a bit vector.
+		#
+		# As every temporary may be a vector over all rows, they are deleted
+		# after their last use. N-ary operations accumulate each operand as
+		# soon as it has been computed, so that, e.g., the products of a sum
+		# are not all alive at the same time.
+		argnames = { varname: f"v{varno}" for (varno, varname) in enumerate(variables) }
+		lines = [ f"def compiled_expression({''.join(f'{argname}, ' for argname in argnames.values())}one = 1):" ]
+		pending_uses = collections.Counter(id(child) for element in self._postorder() for child in element.children)
+		results = { }
+
+		def release(*children):
+			dead = [ ]
+			for child in children:
+				pending_uses[id(child)] -= 1
+				if (pending_uses[id(child)] == 0) and isinstance(child, (UnaryOperator, BinaryOperator, NaryOperator)):
+					dead.append(results.pop(id(child)))
+			if len(dead) > 0:
+				lines.append(f"\tdel {', '.join(dead)}")
+
+		tmpcount = 0
+		stack = [ [ self._expr, 0, None ] ]
+		while len(stack) > 0:
+			frame = stack[-1]
+			(element, child_index, tmpname) = frame
+			if isinstance(element, Variable):
+				results[id(element)] = argnames[element.varname]
+				stack.pop()
+				continue
+			elif isinstance(element, Constant):
+				results[id(element)] = "one" if (element.value == 1) else "0"
+				stack.pop()
+				continue
+
+			children = element.children
+			if child_index < len(children):
+				child = children[child_index]
+				if id(child) not in results:
+					stack.append([ child, 0, None ])
+					continue
+				if isinstance(element, NaryOperator) and (child_index > 0):
+					symbol = self._COMPILED_NARY_OPERATORS[element.op]
+					if child_index == 1:
+						tmpname = frame[2] = f"t{tmpcount}"
+						tmpcount += 1
+						lines.append(f"\t{tmpname} = {results[id(children[0])]} {symbol} {results[id(child)]}")
+						release(children[0], child)
+					else:
+						lines.append(f"\t{tmpname} {symbol}= {results[id(child)]}")
+						release(child)
+				frame[1] += 1
+				continue
+
+			if not isinstance(element, NaryOperator):
+				tmpname = f"t{tmpcount}"
+				tmpcount += 1
+				if isinstance(element, UnaryOperator):
+					lines.append(f"\t{tmpname} = one ^ {results[id(element.rhs)]}")
+				else:
+					lines.append(f"\t{tmpname} = " + self._COMPILED_OPERATORS[element.op].format(results[id(element.lhs)], results[id(element.rhs)]))
+				release(*children)
+			results[id(element)] = tmpname
+			stack.pop()
+		lines.append(f"\treturn {results[id(self._expr)]}")
+		return "\n".join(lines) + "\n"
+
+	def compile(self, variables = None):
+		if variables is None:
+			variables = self.variables
+		variables = tuple(variables)
+		if variables not in self._compiled:
+			namespace = { }
+			exec(compile(self.compile_source(variables), "<compiled expression>", "exec"), namespace)
+			self._compiled[variables] = namespace["compiled_expression"]
+		return self._compiled[variables]
+
+	@staticmethod
+	def variable_vector(bit, state_count):
+		# Bit vector over all rows in which the row index has the given bit set
+		period = 2 << bit
+		vector = ((1 << (1 << bit)) - 1) << (1 << bit)
+		while period < state_count:
+			vector |= vector << period
+			period <<= 1
+		return vector
+
+	def truth_vector(self, variables = None):
+		if variables is None:
+			variables = self.variables
+		state_count = 1 << len(variables)
+		vectors = [ self.variable_vector(len(variables) - 1 - varno, state_count) for varno in range(len(variables)) ]
+		return self.compile(variables)(*vectors, one = (1 << state_count) - 1)
+
+	def cofactor(self, assignment, factory = None):
+		# Residual expression with the assigned variables substituted by
+		# constants and folded away
+		if factory is None:
+			factory = NodeFactory()
+		return ParsedExpression(self._expr.cofactor(assignment, factory))
+
+	def simplify(self, factory = None):
+		from .ExpressionSimplifier import ExpressionSimplifier
+		return ExpressionSimplifier(factory = factory).simplify(self)
+
+	def bdd(self, manager = None):
+		from .BDD import BDD
+		if manager is None:
+			manager = BDD(self.variables)
+		return BDD.Function(manager = manager, edge = manager.build(self._expr))
+
+	def reduce_support(self, factory = None):
+		# Restrict the expression to its functional support, i.e., to the
+		# variables that the function actually depends on. Variables that
+		# vanish when simplifying are dropped without any evaluation; of the
+		# remaining ones, a variable is dropped when the function is the same
+		# for both of its values. Dropped variables are then substituted by
+		# zero, which does not change the function.
+		#
+		# An OR or AND of components over disjoint sets of variables is
+		# reduced component by component, which takes 2^a + 2^b instead of
+		# 2^(a + b) evaluations. If a component is constant one (for OR) or
+		# zero (for AND), so is the whole expression.
+		if factory is None:
+			factory = NodeFactory()
+		simplified = self.simplify(factory = factory)
+		(op, components) = disjoint_components([ simplified ], factory = factory)
+		if op is not None:
+			dominating = 1 if (op == Operator.Or) else 0
+			reduced = [ component.reduce_support(factory = factory) for (component, ) in components ]
+			operands = [ component.expr for component in reduced if not isinstance(component.expr, Constant) ]
+			if (len(operands) < len(reduced)) and any(component.expr.value == dominating for component in reduced if isinstance(component.expr, Constant)):
+				return ParsedExpression(factory.constant(dominating), variables = [ ])
+			elif len(operands) == 0:
+				return ParsedExpression(factory.constant(1 - dominating), variables = [ ])
+			support = set().union(*(component.variables for component in reduced))
+			return ParsedExpression(factory.nary(op, operands), variables = [ varname for varname in self.variables if varname in support ])
+
+		candidates = ParsedExpression(simplified.expr).variables
+		support = simplified._functional_support(candidates)
+		if len(support) == len(self.variables):
+			return simplified
+		dropped = { varname: 0 for varname in candidates if varname not in support }
+		return ParsedExpression(simplified.expr.cofactor(dropped, factory), variables = [ varname for varname in self.variables if varname in support ])
+
+	def _functional_support(self, variables, block_bits = 16):
+		# A variable is in the support iff the two cofactors differ. The
+		# variables are tested in groups that are placed inside the blocks
+		# of the table, where a variable's cofactors are compared by shifting
+		# the block by the variable's bit. Memory thus stays bounded by one
+		# block, and a group's pass through the table stops as soon as all of
+		# its variables have been found to be in the support.
+		support = set()
+		if len(variables) == 0:
+			return support
+		block_bits = min(block_bits, len(variables))
+		row_count = 1 << block_bits
+		for start in range(0, len(variables), block_bits):
+			group = variables[start : start + block_bits]
+			order = [ varname for varname in variables if varname not in group ] + list(group)
+			unset_masks = [ (varname, 1 << (len(group) - 1 - varno), ((1 << row_count) - 1) & ~self.variable_vector(len(group) - 1 - varno, row_count)) for (varno, varname) in enumerate(group) ]
+			for block in self.blocks(order, block_bits = block_bits):
+				for (varname, shift, unset_rows) in unset_masks:
+					if (varname not in support) and (((block.vector >> shift) ^ block.vector) & unset_rows):
+						support.add(varname)
+				if all(varname in support for varname in group):
+					break
+		return support
+
+	def blocks(self, variables = None, block_bits = 16, shannon_expansion = False):
+		# Evaluate the table in blocks of 2^block_bits consecutive rows, each
+		# as a bit vector. Inside a block the least significant variables
+		# alternate in fixed patterns while all others are constant, so
+		# memory stays bounded regardless of the number of variables.
+		#
+		# With Shannon expansion, the most significant variables are split
+		# off recursively and whole subspaces in which the cofactor collapses
+		# to a constant are emitted without evaluation. Cofactoring costs
+		# more than evaluating a block, so this only pays off for
+		# expressions that actually collapse.
+		if variables is None:
+			variables = self.variables
+		block_bits = min(block_bits, len(variables))
+		split_count = len(variables) - block_bits
+		row_count = 1 << block_bits
+		one = (1 << row_count) - 1
+		fnc = self.compile(variables)
+		low_vectors = tuple(self.variable_vector(block_bits - 1 - varno, row_count) for varno in range(block_bits))
+		if not shannon_expansion:
+			for (blockno, high_values) in enumerate(itertools.product((0, one), repeat = split_count)):
+				yield self.Block(offset = blockno << block_bits, row_count = row_count, vector = fnc(*high_values, *low_vectors, one = one))
+			return
+
+		factory = NodeFactory()
+		stack = [ (self._expr, 0, 0) ]
+		while len(stack) > 0:
+			(node, depth, prefix) = stack.pop()
+			if isinstance(node, Constant):
+				vector = one if (node.value == 1) else 0
+				remaining = split_count - depth
+				for blockno in range(prefix << remaining, (prefix + 1) << remaining):
+					yield self.Block(offset = blockno << block_bits, row_count = row_count, vector = vector)
+			elif depth == split_count:
+				high_values = (((prefix >> (split_count - 1 - varno)) & 1) * one for varno in range(split_count))
+				yield self.Block(offset = prefix << block_bits, row_count = row_count, vector = fnc(*high_values, *low_vectors, one = one))
+			else:
+				varname = variables[depth]
+				stack.append((node.cofactor({ varname: 1 }, factory), depth + 1, (prefix << 1) | 1))
+				stack.append((node.cofactor({ varname: 0 }, factory), depth + 1, prefix << 1))
+
+	def evaluations(self, variables = None):
+		for block in self.blocks(variables):
+			yield from bin(block.vector)[:1:-1].ljust(block.row_count, "0").encode().translate(_BIT_CHARS_TO_BYTES)
+
+	def row_values(self, index):
+		varcount = len(self.variables)
+		return tuple((index >> (varcount - 1 - varno)) & 1 for varno in range(varcount))
+
+	def assignment(self, index):
+		return dict(zip(self.variables, self.row_values(index)))
+
+	def rows(self, variables = None):
+		if variables is None:
+			variables = self.variables
+		yield from zip(itertools.product((0, 1), repeat = len(variables)), self.evaluations(variables))
 
 	def table(self):
-		for value in range(self.state_count):
-			value_dict = { varname: int((value & (1 << (len(self.variables) - 1 - varno))) != 0) for (varno, varname) in enumerate(self.variables) }
-			evaluation = self._expr.evaluate(value_dict)
-			yield (value_dict, evaluation)
+		for (values, evaluation) in self.rows():
+			yield (dict(zip(self.variables, values)), evaluation)
+
+	def minterm_indices(self, variables = None):
+		for block in self.blocks(variables):
+			for index in iter_set_bits(block.vector):
+				yield block.offset + index
+
+	def maxterm_indices(self, variables = None):
+		for block in self.blocks(variables):
+			for index in iter_set_bits(block.vector ^ ((1 << block.row_count) - 1)):
+				yield block.offset + index
 
 	def minterms(self):
-		for (value_dict, evaluation) in self.table():
-			if evaluation == 1:
-				yield value_dict
+		for index in self.minterm_indices():
+			yield self.assignment(index)
 
 	def maxterms(self):
-		for (value_dict, evaluation) in self.table():
-			if evaluation == 0:
-				yield value_dict
+		for index in self.maxterm_indices():
+			yield self.assignment(index)
+
+	def gray_rows(self, standard_order = False):
+		# Enumerate all rows in Gray code order so that exactly one variable
+		# changes per step. Node values are cached and only the nodes that
+		# (transitively) depend on the changed variable are recomputed, in
+		# post-order so that children are always up to date.
+		nodes = self._postorder()
+		node_index = { id(node): index for (index, node) in enumerate(nodes) }
+		parents = [ [ ] for node in nodes ]
+		leaves = collections.defaultdict(list)
+		values = [ 0 ] * len(nodes)
+		updates = [ None ] * len(nodes)
+		for (index, node) in enumerate(nodes):
+			if isinstance(node, Variable):
+				leaves[node.varname].append(index)
+				continue
+			elif isinstance(node, Constant):
+				values[index] = node.value
+				continue
+			operands = [ node_index[id(child)] for child in node.children ]
+			for operand in operands:
+				parents[operand].append(index)
+			updates[index] = (index, node, operands)
+			values[index] = node._apply(None, *(values[operand] for operand in operands))
+
+		affected_updates = [ ]
+		for varname in self.variables:
+			affected = set()
+			pending = list(leaves[varname])
+			while len(pending) > 0:
+				for parent in parents[pending.pop()]:
+					if parent not in affected:
+						affected.add(parent)
+						pending.append(parent)
+			affected_updates.append((leaves[varname], [ updates[index] for index in sorted(affected) ]))
+
+		varcount = len(self.variables)
+		root = len(nodes) - 1
+		if standard_order:
+			evaluations = bytearray(self.state_count)
+		for step in range(self.state_count):
+			if step > 0:
+				bit = (step & -step).bit_length() - 1
+				(variable_leaves, variable_updates) = affected_updates[varcount - 1 - bit]
+				for index in variable_leaves:
+					values[index] ^= 1
+				for (index, node, operands) in variable_updates:
+					values[index] = node._apply(None, *(values[operand] for operand in operands))
+			gray_index = step ^ (step >> 1)
+			if standard_order:
+				evaluations[gray_index] = values[root]
+			else:
+				yield (self.row_values(gray_index), values[root])
+
+		if standard_order:
+			yield from zip(itertools.product((0, 1), repeat = varcount), evaluations)
+
+	def gray_table(self, standard_order = False):
+		for (values, evaluation) in self.gray_rows(standard_order = standard_order):
+			yield (dict(zip(self.variables, values)), evaluation)
 
 	def __iter__(self):
-		yield from self._traverse(self._expr)
+		yield from self._postorder()
 
 	def __str__(self):
-		return str(self.expr)
-
-def parse_expression(expr):
-	parser = ExpressionParser()
+		# The string of a node is dropped once all of its parents have used
+		# it, so only the strings of pending operands are kept at any time.
+		postorder = self._postorder()
+		pending_uses = collections.Counter(id(child) for element in postorder for child in element.children)
+		results = { }
+		for element in postorder:
+			operands = [ ]
+			for child in element.children:
+				operands.append(results[id(child)])
+				pending_uses[id(child)] -= 1
+				if pending_uses[id(child)] == 0:
+					del results[id(child)]
+			if isinstance(element, UnaryOperator):
+				results[id(element)] = f"{element.op.symbol}({operands[0]})"
+			elif isinstance(element, (BinaryOperator, NaryOperator)):
+				results[id(element)] = "(" + f" {element.op.symbol} ".join(operands) + ")"
+			else:
+				results[id(element)] = str(element)
+		return results[id(self._expr)]
+
+_BIT_CHARS_TO_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+
+def iter_set_bits(value):
+	# Unpacking all bits with NumPy only pays off if more than about one in
+	# sixteen of them is set, otherwise searching the binary string is faster.
+	numpy = _numpy() if ((value.bit_length() >= (1 << _NUMPY_MIN_VARIABLES)) and (value.bit_count() * 16 >= value.bit_length())) else None
+	if numpy is not None:
+		bits = numpy.unpackbits(numpy.frombuffer(value.to_bytes(length = (value.bit_length() + 7) // 8, byteorder = "little"), dtype = numpy.uint8), bitorder = "little")
+		yield from numpy.flatnonzero(bits).tolist()
+		return
+	bitstr = bin(value)[:1:-1]
+	index = bitstr.find("1")
+	while index != -1:
+		yield index
+		index = bitstr.find("1", index + 1)
+
+def parse_expression(expr, factory = None, backend = "fast"):
+	match backend:
+		case "fast":
+			from .FastExpressionParser import FastExpressionParser
+			parser = FastExpressionParser(factory = factory)
+
+		case "tpg":
+			parser = ExpressionParser(factory = factory)
+
+		case _:
+			raise NotImplementedError(backend)
 	return ParsedExpression(parser(expr))
 
+def reduce_common_support(expressions, factory = None):
+	# Reduce several expressions to the union of their functional supports,
+	# all of them over the same variables in the order they are given in.
+	if factory is None:
+		factory = NodeFactory()
+	reduced = [ expression.reduce_support(factory = factory) for expression in expressions ]
+	support = set().union(*(expression.variables for expression in reduced))
+	variables = [ ]
+	for expression in expressions:
+		variables += (varname for varname in expression.variables if (varname in support) and (varname not in variables))
+	return [ expression if (list(expression.variables) == variables) else ParsedExpression(expression.expr, variables = variables) for expression in reduced ]
+
+def disjoint_components(expressions, factory = None):
+	# Split expressions that all are an OR (or all an AND) of operands into
+	# groups of operands over pairwise disjoint sets of variables. Returns
+	# the operator and, for every group, one component per expression; a
+	# component without any operands is the operator's identity. Returns
+	# (None, [ ]) if the expressions do not decompose.
+	if factory is None:
+		factory = NodeFactory()
+	ops = set(expression.expr.op if isinstance(expression.expr, NaryOperator) else None for expression in expressions)
+	if (len(ops) != 1) or (ops & { None, Operator.Xor }):
+		return (None, [ ])
+	op = ops.pop()
+
+	# Union-find over the variables, joining all variables of an operand
+	parents = { }
+	def find(varname):
+		while parents.setdefault(varname, varname) != varname:
+			parents[varname] = parents[parents[varname]]
+			varname = parents[varname]
+		return varname
+
+	operand_variables = [ [ (operand, ParsedExpression(operand).variables) for operand in expression.expr.operands ] for expression in expressions ]
+	for operands in operand_variables:
+		for (operand, varnames) in operands:
+			if len(varnames) == 0:
+				return (None, [ ])
+			root = find(varnames[0])
+			for varname in varnames[1 : ]:
+				parents[find(varname)] = root
+
+	variables = [ ]
+	for expression in expressions:
+		variables += (varname for varname in expression.variables if (varname in parents) and (varname not in variables))
+	roots = [ ]
+	for varname in variables:
+		if find(varname) not in roots:
+			roots.append(find(varname))
+	if len(roots) < 2:
+		return (None, [ ])
+
+	identity = factory.constant(0 if (op == Operator.Or) else 1)
+	components = [ ]
+	for root in roots:
+		group_variables = [ varname for varname in variables if find(varname) == root ]
+		group = [ ]
+		for operands in operand_variables:
+			group_operands = [ operand for (operand, varnames) in operands if find(varnames[0]) == root ]
+			group.append(ParsedExpression(factory.nary(op, group_operands) if (len(group_operands) > 0) else identity, variables = group_variables))
+		components.append(group)
+	return (op, components)
+
+def parse_expression_stream(stream, factory = None):
+	from .FastExpressionParser import FastExpressionParser
+	parser = FastExpressionParser(factory = factory)
+	return ParsedExpression(parser.parse_stream(stream))
+
+def parse_expression_argument(argument, factory = None):
+	# Command line arguments either are the expression itself, "-" to read it
+	# from stdin or "@filename" to read it from a file.
+	if argument == "-":
+		return parse_expression_stream(sys.stdin, factory = factory)
+	elif argument.startswith("@"):
+		with open(argument[1:]) as f:
+			return parse_expression_stream(f, factory = factory)
+	else:
+		return parse_expression(argument, factory = factory)
+
 
 if __name__ == "__main__":
 	parser = ExpressionParser()
@@ -0,0 +1,172 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import weakref
+import collections
+from .ExpressionParser import Operator, NodeFactory, Variable, Constant, UnaryOperator, BinaryOperator, NaryOperator, ParsedExpression
+
+class ExpressionSimplifier():
+	# Bottom-up algebraic normalization of an expression DAG: constant
+	# propagation, double negation removal, idempotence, complementation,
+	# absorption and a canonical operand order for commutative operators.
+	# All nodes are built through the factory, so that equivalent normalized
+	# subexpressions end up as the very same node. Simplifiers that share a
+	# factory share its ranks as well and therefore order operands alike.
+	_FACTORY_RANKS = weakref.WeakKeyDictionary()
+
+	def __init__(self, factory = None):
+		self._factory = factory if (factory is not None) else NodeFactory()
+		self._keys = { }
+		self._ranks = self._FACTORY_RANKS.setdefault(self._factory, { })
+
+	def _key(self, node):
+		# Structural sort key; a negation sorts right after its operand. The
+		# children of an operator only enter through their rank, a number
+		# given to every distinct key, so keys stay flat and comparing them
+		# does not recurse however deep the expression is.
+		stack = [ node ]
+		while len(stack) > 0:
+			element = stack[-1]
+			if id(element) in self._keys:
+				stack.pop()
+				continue
+			missing = [ child for child in element.children if id(child) not in self._keys ]
+			if len(missing) > 0:
+				stack += missing
+				continue
+			stack.pop()
+			if isinstance(element, Variable):
+				key = (0, element.varname, 0, ( ), 0)
+			elif isinstance(element, Constant):
+				key = (1, "", element.value, ( ), 0)
+			elif isinstance(element, UnaryOperator):
+				key = self._keys[id(element.rhs)][ : 4] + (1, )
+			else:
+				key = (2, "", int(element.op), tuple(self._ranks.setdefault(self._keys[id(child)], len(self._ranks)) for child in element.children), 0)
+			self._keys[id(element)] = key
+		return self._keys[id(node)]
+
+	def _negate(self, node):
+		if isinstance(node, Constant):
+			return self._factory.constant(1 ^ node.value)
+		elif isinstance(node, UnaryOperator):
+			return node.rhs
+		return self._factory.unary(Operator.Not, node)
+
+	def _build(self, op, operands, identity):
+		if len(operands) == 0:
+			return self._factory.constant(identity)
+		elif len(operands) == 1:
+			return operands[0]
+		operands.sort(key = self._key)
+		return self._factory.nary(op, operands)
+
+	def _absorb(self, op, operands):
+		# X + X Y = X and X (X + Y) = X: an operand is dropped when the
+		# operands of another one are a proper subset of its own. Candidates
+		# are found by intersecting the operands containing each element.
+		inner_op = Operator.And if (op == Operator.Or) else Operator.Or
+		elements = [ set(operand.operands) if (isinstance(operand, NaryOperator) and (operand.op == inner_op)) else { operand } for operand in operands ]
+		containing = collections.defaultdict(set)
+		for (index, operand_elements) in enumerate(elements):
+			for element in operand_elements:
+				containing[element].add(index)
+
+		absorbed = set()
+		for operand_elements in elements:
+			candidates = None
+			for element in sorted(operand_elements, key = lambda element: len(containing[element])):
+				candidates = containing[element] if (candidates is None) else (candidates & containing[element])
+				if len(candidates) == 1:
+					break
+			absorbed |= { index for index in candidates if len(elements[index]) > len(operand_elements) }
+		return [ operand for (index, operand) in enumerate(operands) if index not in absorbed ]
+
+	def _and_or(self, op, operands):
+		(controlling, identity) = (1, 0) if (op == Operator.Or) else (0, 1)
+		unique = { }
+		for operand in operands:
+			if isinstance(operand, Constant):
+				if operand.value == controlling:
+					return self._factory.constant(controlling)
+			elif isinstance(operand, NaryOperator) and (operand.op == op):
+				unique.update((child, None) for child in operand.operands)
+			else:
+				unique[operand] = None
+
+		for operand in unique:
+			if isinstance(operand, UnaryOperator) and (operand.rhs in unique):
+				# X + !X = 1 and X !X = 0
+				return self._factory.constant(controlling)
+		return self._build(op, self._absorb(op, list(unique)), identity)
+
+	def _xor(self, operands):
+		# Negations are pulled out of the XOR and operands that occur twice
+		# cancel each other out.
+		parity = 0
+		counts = collections.Counter()
+		pending = list(operands)
+		while len(pending) > 0:
+			operand = pending.pop()
+			if isinstance(operand, UnaryOperator):
+				parity ^= 1
+				operand = operand.rhs
+			if isinstance(operand, Constant):
+				parity ^= operand.value
+			elif isinstance(operand, NaryOperator) and (operand.op == Operator.Xor):
+				pending += operand.operands
+			else:
+				counts[operand] += 1
+		result = self._build(Operator.Xor, [ operand for (operand, count) in counts.items() if (count % 2) == 1 ], 0)
+		return self._negate(result) if parity else result
+
+	def _nary(self, op, operands):
+		if op == Operator.Xor:
+			return self._xor(operands)
+		return self._and_or(op, operands)
+
+	def _binary(self, lhs, op, rhs):
+		if op not in (Operator.Nand, Operator.Nor):
+			return self._nary(op, [ lhs, rhs ])
+
+		# NAND and NOR are kept unless their inner AND or OR simplifies
+		inner = self._nary(Operator.And if (op == Operator.Nand) else Operator.Or, [ lhs, rhs ])
+		if isinstance(inner, NaryOperator) and (inner.operands in ((lhs, rhs), (rhs, lhs))):
+			return self._factory.binary(inner.operands[0], op, inner.operands[1])
+		return self._negate(inner)
+
+	def simplify(self, expression):
+		results = { }
+		for node in expression:
+			children = [ results[id(child)] for child in node.children ]
+			if isinstance(node, Variable):
+				result = self._factory.variable(node.varname)
+			elif isinstance(node, Constant):
+				result = self._factory.constant(node.value)
+			elif isinstance(node, UnaryOperator):
+				result = self._negate(children[0])
+			elif isinstance(node, BinaryOperator):
+				result = self._binary(children[0], node.op, children[1])
+			else:
+				result = self._nary(node.op, children)
+			self._key(result)
+			results[id(node)] = result
+		return ParsedExpression(results[id(expression.expr)], variables = expression.variables)
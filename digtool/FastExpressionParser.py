@@ -0,0 +1,231 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import re
+from . import tpg
+from .ExpressionParser import NodeFactory, OperatorChain
+
+class FastExpressionParser():
+	# Hand-written equivalent of the tpg-generated ExpressionParser: a single
+	# regular expression tokenizes the input and a precedence climbing parser
+	# builds the very same nodes. It accepts exactly the same language and
+	# reports errors with the same exception types, messages and positions.
+	_TOKEN_RE = re.compile(r"\s*(?:([()|+&*^@#!01-])|([a-zA-Z_][a-zA-Z0-9_]*)|(\S))")
+	_SYMBOL_KINDS = {
+		"(":	"(",
+		")":	")",
+		"|":	"+",
+		"+":	"+",
+		"&":	"*",
+		"*":	"*",
+		"^":	"^",
+		"@":	"@",
+		"#":	"#",
+		"!":	"!",
+		"-":	"!",
+		"0":	"0",
+		"1":	"0",
+		"$":	"$",
+	}
+	_TERM_OPERATORS = frozenset("*^@#")
+	_ATOM_START = frozenset("v0!(")
+	_INCOMPLETE_TAIL_RE = re.compile(r"[a-zA-Z0-9_]*\Z")
+	_CHUNK_SIZE = 1 << 16
+
+	def __init__(self, factory = None):
+		self.factory = factory if (factory is not None) else NodeFactory()
+		self._stream = None
+		self._pending = None
+		self._chunk = None
+		self._chunk_location = None
+		self._previous_token = None
+		self._tokens = None
+		self._index = None
+		self._kind = None
+		self._text = None
+
+	def _tokenize(self, text):
+		# Tokens are (symbol, variable, error) tuples of which exactly one
+		# element is non-empty. Their positions are only needed to report
+		# errors and are recovered by _token_position() in that case.
+		tokens = self._TOKEN_RE.findall(text)
+		if self._stream is None:
+			tokens.append(("$", "", ""))
+		return tokens
+
+	def _read_chunk(self):
+		# Input is consumed chunk by chunk. A trailing run of identifier
+		# characters might continue in the next chunk and is therefore held
+		# back until either more data or the end of the stream arrives.
+		while self._stream is not None:
+			data = self._stream.read(self._CHUNK_SIZE)
+			if not data:
+				self._stream = None
+				break
+			text = self._pending + data
+			cut = self._INCOMPLETE_TAIL_RE.search(text).start()
+			if cut > 0:
+				self._pending = text[cut:]
+				return text[:cut]
+			self._pending = text
+		(text, self._pending) = (self._pending, "")
+		return text
+
+	def _next_chunk(self):
+		if self._chunk is not None:
+			if len(self._tokens) > 0:
+				index = len(self._tokens) - 1
+				self._previous_token = (self._location(self._token_position(index)), "".join(self._tokens[index]))
+			self._chunk_location = self._location(len(self._chunk))
+		self._chunk = self._read_chunk()
+		self._tokens = self._tokenize(self._chunk)
+		self._index = 0
+
+	def _token_position(self, index):
+		for (token_index, match) in enumerate(self._TOKEN_RE.finditer(self._chunk)):
+			if token_index == index:
+				return match.end() - len(match.group(match.lastindex))
+		return len(self._chunk)
+
+	def _location(self, pos):
+		(line, column) = self._chunk_location
+		newlines = self._chunk.count("\n", 0, pos)
+		if newlines == 0:
+			return (line, column + pos)
+		return (line + newlines, pos - self._chunk.rfind("\n", 0, pos))
+
+	def _advance(self):
+		text = self._text
+		self._index += 1
+		while self._index == len(self._tokens):
+			self._next_chunk()
+		(symbol, variable, error) = self._tokens[self._index]
+		if symbol:
+			self._kind = self._SYMBOL_KINDS[symbol]
+			self._text = symbol
+		elif variable:
+			self._kind = "v"
+			self._text = variable
+		else:
+			pos = self._token_position(self._index)
+			error_text = self._chunk[pos : pos + 20] + self._pending
+			if (len(error_text) < 20) and (self._stream is not None):
+				error_text += self._stream.read(20)
+			error_text = error_text[:20].split("\n", 1)[0]
+			raise tpg.LexicalError(self._location(pos), f"Lexical error near {error_text}")
+		return text
+
+	def _syntax_error(self):
+		# tpg reports the furthest token it has read, which is the lookahead
+		# token or, at the end of input, the last token before it.
+		index = self._index if (self._kind != "$") else (self._index - 1)
+		if index >= 0:
+			(symbol, variable, error) = self._tokens[index]
+			raise tpg.SyntacticError(self._location(self._token_position(index)), f"Syntax error near {symbol or variable}")
+		elif self._previous_token is not None:
+			(location, text) = self._previous_token
+			raise tpg.SyntacticError(location, f"Syntax error near {text}")
+		else:
+			raise tpg.SyntacticError((1, 1), "Syntax error near ")
+
+	def _atom(self):
+		# Negations are collected iteratively so that long runs of them do
+		# not recurse. Returns the negations and the atom, which is None for
+		# an opening parenthesis.
+		negations = [ ]
+		while self._kind == "!":
+			negations.append(self._advance())
+
+		if self._kind == "v":
+			atom = self.factory.variable(self._advance())
+		elif self._kind == "0":
+			atom = self.factory.constant(int(self._advance()))
+		elif self._kind == "(":
+			self._advance()
+			atom = None
+		else:
+			self._syntax_error()
+		return (negations, atom)
+
+	def _expr(self):
+		# Parenthesized subexpressions do not recurse either: the state of
+		# the enclosing expression, i.e. its sum and product chains, the
+		# operators that join the next term and atom to them and the
+		# negations in front of the parenthesis, is kept on a stack instead.
+		stack = [ ]
+		(expr_chain, expr_op, term_chain, term_op) = (None, None, None, None)
+		while True:
+			(negations, atom) = self._atom()
+			if atom is None:
+				stack.append((expr_chain, expr_op, term_chain, term_op, negations))
+				(expr_chain, expr_op, term_chain, term_op) = (None, None, None, None)
+				continue
+
+			while True:
+				for op in reversed(negations):
+					atom = self.factory.unary(op, atom)
+				if term_chain is None:
+					term_chain = OperatorChain(self.factory, atom)
+				else:
+					term_chain.append(term_op, atom)
+
+				if self._kind in self._TERM_OPERATORS:
+					term_op = self._advance()
+					break
+				elif self._kind in self._ATOM_START:
+					term_op = "*"
+					break
+
+				if expr_chain is None:
+					expr_chain = OperatorChain(self.factory, term_chain.node)
+				else:
+					expr_chain.append(expr_op, term_chain.node)
+				term_chain = None
+				if self._kind == "+":
+					expr_op = self._advance()
+					break
+
+				if len(stack) == 0:
+					return expr_chain.node
+				if self._kind != ")":
+					self._syntax_error()
+				self._advance()
+				atom = expr_chain.node
+				(expr_chain, expr_op, term_chain, term_op, negations) = stack.pop()
+
+	def _parse(self, stream, text):
+		(self._stream, self._pending) = (stream, text)
+		(self._chunk, self._chunk_location, self._previous_token) = (None, (1, 1), None)
+		(self._tokens, self._index, self._kind, self._text) = ([ ], -1, None, None)
+		self._advance()
+		result = self._expr()
+		if self._kind != "$":
+			self._syntax_error()
+		return result
+
+	def parse_stream(self, stream):
+		# The stream is tokenized incrementally, so only the current chunk
+		# and the (hash-consed) expression are held in memory. A flat sum of
+		# products is thereby reduced term by term while it is being read.
+		return self._parse(stream, "")
+
+	def __call__(self, text):
+		return self._parse(None, text)
@@ -0,0 +1,103 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import sys
+import marshal
+import hashlib
+import importlib.util
+from . import tpg
+
+class GrammarCache():
+	# Normally tpg translates the docstring grammar of a parser class each
+	# time the class is defined, i.e., on every import. Instead, the parser
+	# methods generated from a grammar are compiled once and the code object
+	# is cached next to the module's bytecode, keyed by a hash of the grammar
+	# and the tpg version. Like bytecode, the cache is placed below
+	# sys.pycache_prefix if one is set and is not written with -B or
+	# PYTHONDONTWRITEBYTECODE.
+	_DISABLE_ENVIRONMENT_VARIABLE = "DIGTOOL_NO_GRAMMAR_CACHE"
+
+	def __init__(self, parser_class, grammar, namespace):
+		self._parser_class = parser_class
+		self._grammar = grammar
+		self._namespace = namespace
+
+	@property
+	def grammar_hash(self):
+		hashval = hashlib.sha256()
+		hashval.update(tpg.__version__.encode())
+		hashval.update(b"\x00")
+		hashval.update(self._grammar.encode())
+		return hashval.hexdigest()[:32]
+
+	@property
+	def cache_filename(self):
+		module_filename = sys.modules[self._parser_class.__module__].__file__
+		cache_dir = os.path.dirname(importlib.util.cache_from_source(module_filename))
+		return os.path.join(cache_dir, f"{self._parser_class.__name__}.{self.grammar_hash}.{sys.implementation.cache_tag}.grammar")
+
+	@property
+	def enabled(self):
+		return os.environ.get(self._DISABLE_ENVIRONMENT_VARIABLE, "") == ""
+
+	def generate_source(self):
+		parser = tpg.TPGParser(self._namespace)
+		return "".join(source + "\n" for (attribute, source, code) in parser(self._grammar))
+
+	def _compile(self):
+		return compile(self.generate_source(), f"<grammar of {self._parser_class.__name__}>", "exec")
+
+	def _load(self):
+		with open(self.cache_filename, "rb") as f:
+			return marshal.load(f)
+
+	def _store(self, code):
+		cache_filename = self.cache_filename
+		tmp_filename = f"{cache_filename}.{os.getpid()}"
+		os.makedirs(os.path.dirname(cache_filename), exist_ok = True)
+		with open(tmp_filename, "wb") as f:
+			marshal.dump(code, f)
+		os.replace(tmp_filename, cache_filename)
+
+	def get_code(self):
+		if not self.enabled:
+			return self._compile()
+		try:
+			return self._load()
+		except (OSError, EOFError, ValueError, TypeError):
+			pass
+
+		code = self._compile()
+		if sys.dont_write_bytecode:
+			return code
+		try:
+			self._store(code)
+		except OSError:
+			# Read-only installation, use the freshly compiled code.
+			pass
+		return code
+
+	def install(self):
+		methods = { }
+		exec(self.get_code(), self._namespace, methods)
+		for (name, method) in methods.items():
+			setattr(self._parser_class, name, method)
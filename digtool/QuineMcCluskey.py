@@ -19,23 +19,54 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+import sys
 import collections
 import itertools
+from .ExpressionParser import Operator, disjoint_components
 
 class QuineMcCluskey():
-	Implicant = collections.namedtuple("Implicant", [ "minterms", "value", "mask" ])
-
-	def __init__(self, expression, dc_expression = None, verbosity = 0):
+	# An implicant is a cube: it covers all minterms that equal its value in
+	# all bits that are not set in its mask. Covered minterms are only
+	# expanded for the covering step.
+	Implicant = collections.namedtuple("Implicant", [ "value", "mask" ])
+	_COVER_SEARCH_MEMO = 1 << 16
+
+	def __init__(self, expression, dc_expression = None, verbosity = 0, merge_strategy = None, cover_budget = None):
+		assert(merge_strategy in (None, "pairwise", "lookup"))
+		assert((cover_budget is None) or (cover_budget >= 1))
 		self._expr = expression
 		self._dc_expr = dc_expression
 		self._verbose = verbosity
-
-	def _minterm2int(self, minterm):
-		result = 0
-		for (no, var_name) in enumerate(reversed(self._expr.variables)):
-			if minterm[var_name]:
-				result |= 1 << no
-		return result
+		self._merge_strategy = merge_strategy
+		self._cover_budget = cover_budget
+		self._merged = set()
+		self._minterm_cache = { }
+		self._cover_minimal = True
+
+	@staticmethod
+	def _contains(outer, inner):
+		return ((inner.mask & ~outer.mask) == 0) and ((inner.value & ~outer.mask) == outer.value)
+
+	@staticmethod
+	def _bits(value):
+		# Indices of the set bits of an integer, lowest first
+		while value != 0:
+			lowest = value & -value
+			value ^= lowest
+			yield lowest.bit_length() - 1
+
+	def _implicant_minterms(self, implicant):
+		if implicant not in self._minterm_cache:
+			# Enumerate all subsets of the mask bits
+			minterms = [ ]
+			subset = implicant.mask
+			while True:
+				minterms.append(implicant.value | subset)
+				if subset == 0:
+					break
+				subset = (subset - 1) & implicant.mask
+			self._minterm_cache[implicant] = frozenset(minterms)
+		return self._minterm_cache[implicant]
 
 	def _group_by_bitcount(self, values):
 		result = collections.defaultdict(list)
@@ -44,10 +75,36 @@ class QuineMcCluskey():
 		return result
 
 	def _create_prime_implicants(self, grouped_minterms):
-		return { bit_count: { 0: [ self.Implicant(minterms = frozenset([ minterm ]), value = minterm, mask = 0) for minterm in minterms ] } for (bit_count, minterms) in grouped_minterms.items() }
+		return { bit_count: { 0: [ self.Implicant(value = minterm, mask = 0) for minterm in minterms ] } for (bit_count, minterms) in grouped_minterms.items() }
+
+	def _merge_pairwise(self, implicants_1, implicants_2):
+		for (implicant1, implicant2) in itertools.product(implicants_1, implicants_2):
+			mask = implicant1.value ^ implicant2.value
+			if mask.bit_count() == 1:
+				yield (implicant1, implicant2)
+
+	def _merge_by_lookup(self, implicants_1, implicants_2, variable_mask):
+		# Partners differ in exactly one bit which is neither masked nor set
+		implicants_2_by_value = { implicant2.value: implicant2 for implicant2 in implicants_2 }
+		for implicant1 in implicants_1:
+			free = variable_mask & ~(implicant1.mask | implicant1.value)
+			while free != 0:
+				bit = free & -free
+				free ^= bit
+				implicant2 = implicants_2_by_value.get(implicant1.value | bit)
+				if implicant2 is not None:
+					yield (implicant1, implicant2)
 
 	def _merge_implicants(self, grouped_implicants):
+		# Implicants of the same mask whose values differ in a single bit are
+		# merged. Comparing all pairs costs |group 1| * |group 2| comparisons.
+		# Looking up the partners costs |group 2| insertions into a dict plus
+		# |group 1| * (free bits) lookups, each of which takes about 1.75
+		# times as long as a comparison (fitted on the groups of
+		# benchmarks/qmc_merge.py). Whichever is cheaper is used, so small
+		# and sparse groups are compared pairwise.
 		result = collections.defaultdict(lambda: collections.defaultdict(list))
+		variable_mask = (1 << len(self._expr.variables)) - 1
 
 		highest_bit_count = max(grouped_implicants.keys())
 		for (bit_count, implicants_1_by_mask) in grouped_implicants.items():
@@ -61,20 +118,31 @@ class QuineMcCluskey():
 			found_merged = set()
 			for (mask_bits, implicants_1) in implicants_1_by_mask.items():
 				implicants_2 = implicants_2_by_mask.get(mask_bits, [ ])
+				if len(implicants_2) == 0:
+					continue
 
-				for (implicant1, implicant2) in itertools.product(implicants_1, implicants_2):
-					mask = implicant1.value ^ implicant2.value
-					if mask.bit_count() == 1:
-						merged_minterms = implicant1.minterms | implicant2.minterms
-						merged_minterm_tuple = tuple(sorted(merged_minterms))
-						if merged_minterm_tuple not in found_merged:
-							found_merged.add(merged_minterm_tuple)
-							merged_implicant = self.Implicant(minterms = merged_minterms, value = implicant1.value & ~mask, mask = implicant1.mask | mask)
-							#print("Merging", implicant1, implicant2, merged_implicant)
-							result[bit_count][implicant1.mask | mask].append(merged_implicant)
+				strategy = self._merge_strategy
+				if strategy is None:
+					free_bits = len(self._expr.variables) - mask_bits.bit_count() - bit_count
+					pairwise_cost = len(implicants_1) * len(implicants_2)
+					lookup_cost = len(implicants_2) + 1.75 * len(implicants_1) * free_bits
+					strategy = "pairwise" if (pairwise_cost <= lookup_cost) else "lookup"
+				if strategy == "pairwise":
+					partners = self._merge_pairwise(implicants_1, implicants_2)
+				else:
+					partners = self._merge_by_lookup(implicants_1, implicants_2, variable_mask)
+
+				for (implicant1, implicant2) in partners:
+					# Both are contained in the merged implicant, so neither
+					# of them is prime
+					self._merged.add(implicant1)
+					self._merged.add(implicant2)
+					merged_implicant = self.Implicant(value = implicant1.value, mask = implicant1.mask | (implicant1.value ^ implicant2.value))
+					if merged_implicant not in found_merged:
+						found_merged.add(merged_implicant)
+						result[bit_count][merged_implicant.mask].append(merged_implicant)
 		return result
 
-
 	def _create_merged_implicant_groups(self, prime_implicants):
 		all_implicants = {
 			1: prime_implicants,
@@ -99,31 +167,20 @@ class QuineMcCluskey():
 		return result
 
 	def _eliminate_suboptimal_implicants(self, all_implicants):
+		# An implicant that is contained in a larger one has been merged with
+		# its partner into that one; all others are prime.
 		result = { }
-		top_group = max(all_implicants.keys())
-		for lower_group_id in range(1, top_group):
-			upper_group_id = lower_group_id + 1
-
-			eliminated_lower_group = [ ]
-			for lower_implicant in all_implicants[lower_group_id]:
-				for upper_implicant in all_implicants[upper_group_id]:
-					if (lower_implicant.minterms & upper_implicant.minterms) == lower_implicant.minterms:
-						# Lower implicant is full subgroup of upper, eliminate.
-						break
-				else:
-					# Nowhere in the upper group, it's required.
-					eliminated_lower_group.append(lower_implicant)
-
-			if len(eliminated_lower_group) > 0:
-				result[lower_group_id] = eliminated_lower_group
-		result[top_group] = all_implicants[top_group]
+		for (group_id, implicants) in all_implicants.items():
+			prime_implicants = [ implicant for implicant in implicants if implicant not in self._merged ]
+			if len(prime_implicants) > 0:
+				result[group_id] = prime_implicants
 		return result
 
 	def _determine_required_minterms(self, all_implicants):
 		ctr = collections.Counter()
 		for (group, implicants) in all_implicants.items():
 			for implicant in implicants:
-				ctr.update(implicant.minterms)
+				ctr.update(self._implicant_minterms(implicant))
 
 		required = set()
 		for (minterm, count) in ctr.items():
@@ -137,7 +194,7 @@ class QuineMcCluskey():
 		for (group, implicants) in all_implicants.items():
 			eliminated_implicants = [ ]
 			for implicant in implicants:
-				if len(required_minterms & implicant.minterms) > 0:
+				if not required_minterms.isdisjoint(self._implicant_minterms(implicant)):
 					required_implicants.append(implicant)
 				else:
 					eliminated_implicants.append(implicant)
@@ -146,51 +203,218 @@ class QuineMcCluskey():
 		return (required_implicants, result)
 
 	def _compute_remaining_minterms(self, expr_minterms, required_implicants):
-		remaining_minterms = set(expr_minterms)
+		covered_minterms = set()
 		for implicant in required_implicants:
-			remaining_minterms = remaining_minterms - implicant.minterms
-		return remaining_minterms
+			covered_minterms |= self._implicant_minterms(implicant)
+		return set(expr_minterms) - covered_minterms
 
 	def _group_implicants_by_minterm(self, all_implicants):
 		result = collections.defaultdict(list)
 		for implicants in all_implicants.values():
 			for implicant in implicants:
-				for minterm in implicant.minterms:
+				for minterm in self._implicant_minterms(implicant):
 					result[minterm].append(implicant)
 		return result
 
-	def _enumerate_fulfilling_implicants(self, remaining_minterms, grouped_implicants, included = None):
-		if included is None:
-			included = set()
-		if len(remaining_minterms) == 0:
-			yield included
-			return
-
-		# We're not done yet.
-		analyzed = set()
-		for remaining_minterm in remaining_minterms:
-			for candidate_implicant in grouped_implicants[remaining_minterm]:
-				if candidate_implicant in analyzed:
-					# We've already covered this path.
-					continue
-				if candidate_implicant in included:
-					# It's already considered
-					continue
-				analyzed.add(candidate_implicant)
+	def _reduce_chart(self, covers, covering, rows = None, columns = None, reduced = None):
+		# Classic reduction of the covering chart until nothing changes:
+		# implicants that are the only ones left for a minterm are
+		# (secondary) essential, a minterm is dropped if every implicant of
+		# some other minterm covers it as well, and an implicant that covers
+		# a subset of what another one covers is not needed. Of identical
+		# minterms or implicants, one is kept.
+		# Only the given minterms and implicants are considered, by default
+		# all of them. If the chart was derived by removing minterms and
+		# implicants from the chart "reduced", a (rows, columns) tuple that
+		# already is reduced, only what the removal changed is examined.
+		# Returns the essential implicants and the remaining minterms and
+		# implicants, all as bitsets, or None if some minterm cannot be
+		# covered anymore.
+		essentials = 0
+		if rows is None:
+			rows = (1 << len(covering)) - 1
+		if columns is None:
+			columns = (1 << len(covers)) - 1
+
+		# Only minterms that lost implicants can become essential or dominate
+		# others, and only implicants that lost minterms can be dominated.
+		if reduced is None:
+			(changed_rows, changed_columns) = (rows, columns)
+		else:
+			(changed_rows, changed_columns) = (0, 0)
+			for index in self._bits(reduced[1] & ~columns):
+				changed_rows |= covers[index]
+			for row in self._bits(reduced[0] & ~rows):
+				changed_columns |= covering[row]
+
+		def remove_rows(removed):
+			nonlocal rows, changed_columns
+			rows &= ~removed
+			for row in self._bits(removed):
+				changed_columns |= covering[row]
+
+		while True:
+			changed_rows &= rows
+			changed_columns &= columns
+			if changed_rows != 0:
+				row = (changed_rows & -changed_rows).bit_length() - 1
+				changed_rows ^= 1 << row
+				available = covering[row] & columns
+				if available == 0:
+					return None
+				elif (available & (available - 1)) == 0:
+					index = available.bit_length() - 1
+					essentials |= available
+					columns &= ~available
+					remove_rows(covers[index] & rows)
+				else:
+					# The minterms covered by every implicant of this one
+					dominated = rows & ~(1 << row)
+					for index in self._bits(available):
+						dominated &= covers[index]
+					remove_rows(dominated)
+			elif changed_columns != 0:
+				index = (changed_columns & -changed_columns).bit_length() - 1
+				changed_columns ^= 1 << index
+				covered = covers[index] & rows
+				# The implicants that cover every minterm of this one
+				dominating = columns & ~(1 << index)
+				for row in self._bits(covered):
+					dominating &= covering[row]
+				if (covered == 0) or (dominating != 0):
+					columns &= ~(1 << index)
+					changed_rows |= covered
+			else:
+				return (essentials, rows, columns)
+
+	def _greedy_cover(self, covers, covering):
+		# Reduces the chart and then picks the implicant that covers the
+		# most remaining minterms, until all are covered
+		chosen = [ ]
+		(essentials, rows, columns) = self._reduce_chart(covers, covering)
+		while True:
+			chosen += self._bits(essentials)
+			if rows == 0:
+				return chosen
+			index = max(self._bits(columns), key = lambda index: (covers[index] & rows).bit_count())
+			chosen.append(index)
+			(essentials, rows, columns) = self._reduce_chart(covers, covering, rows & ~covers[index], columns & ~(1 << index), reduced = (rows, columns))
+
+	def _independent_rows(self, covers, covering, rows, columns, independent):
+		# Extends a set of minterms no two of which share an implicant. No
+		# implicant covers two of them, so each one needs an implicant of
+		# its own. Minterms with the fewest implicants are added first.
+		def neighborhood(row):
+			minterms = 0
+			for index in self._bits(covering[row] & columns):
+				minterms |= covers[index]
+			return minterms
+
+		candidates = rows & ~independent
+		for row in self._bits(independent):
+			candidates &= ~neighborhood(row)
+		while candidates != 0:
+			row = min(self._bits(candidates), key = lambda row: (covering[row] & columns).bit_count())
+			independent |= 1 << row
+			candidates &= ~neighborhood(row)
+		return independent
+
+	def _minimum_cover(self, covers, covering):
+		# Minimum cover by branch and bound, returns the indices of the
+		# chosen implicants and whether the cover is known to be minimal.
+		# Every node is a chart of the minterms left to cover and the
+		# implicants still allowed, which is reduced before branching on the
+		# minterm with the fewest implicants: the k-th branch chooses its
+		# k-th implicant and rules out the ones before. With a cover budget,
+		# the search stops after that many nodes, leaving the best cover
+		# found so far.
+		best = self._greedy_cover(covers, covering)
+
+		# Charts already searched with as few implicants chosen or fewer, the
+		# oldest entries are evicted once the limit is reached
+		explored = { }
+
+		# Chosen implicants are linked lists of (index, rest) pairs that are
+		# shared among siblings
+		stack = [ ((1 << len(covering)) - 1, (1 << len(covers)) - 1, None, None, 0, 0) ]
+		node_count = 0
+		while len(stack) > 0:
+			if node_count == self._cover_budget:
+				return (best, False)
+			node_count += 1
+
+			(rows, columns, reduced, chosen, chosen_count, independent) = stack.pop()
+			reduction = self._reduce_chart(covers, covering, rows, columns, reduced = reduced)
+			if reduction is None:
+				continue
+			(essentials, rows, columns) = reduction
+			for index in self._bits(essentials):
+				chosen = (index, chosen)
+				chosen_count += 1
+			if chosen_count >= len(best):
+				continue
+			if rows == 0:
+				best = [ ]
+				while chosen is not None:
+					(index, chosen) = chosen
+					best.append(index)
+				continue
+			key = (rows, columns)
+			if explored.get(key, chosen_count + 1) <= chosen_count:
+				continue
+			if len(explored) >= self._COVER_SEARCH_MEMO:
+				del explored[next(iter(explored))]
+			explored[key] = chosen_count
+
+			# Minterms independent in the parent chart still are, as the
+			# implicants are a subset of the parent's
+			independent = self._independent_rows(covers, covering, rows, columns, independent & rows)
+			if chosen_count + independent.bit_count() >= len(best):
+				continue
 
-				remaining_path = remaining_minterms - candidate_implicant.minterms
-				included_path = set(included)
-				included_path.add(candidate_implicant)
-				yield from self._enumerate_fulfilling_implicants(remaining_path, grouped_implicants, included_path)
+			row = min(self._bits(rows), key = lambda row: (covering[row] & columns).bit_count())
+			branches = sorted(self._bits(covering[row] & columns), key = lambda index: -(covers[index] & rows).bit_count())
+			children = [ ]
+			allowed = columns
+			for index in branches:
+				allowed &= ~(1 << index)
+				children.append((rows & ~covers[index], allowed, (rows, columns), (index, chosen), chosen_count + 1, independent))
+			stack += reversed(children)
+		return (best, True)
 
 	def _find_minimal_expression(self, remaining_minterms, grouped_implicants):
-		min_length = None
-		optimal_solution = None
-		for implicants in self._enumerate_fulfilling_implicants(remaining_minterms, grouped_implicants):
-			if (min_length is None) or (len(implicants) < min_length):
-				min_length = len(implicants)
-				optimal_solution = implicants
-		return optimal_solution
+		# Covering chart with one bitset per implicant of the remaining
+		# minterms it covers and, conversely, one bitset per minterm of the
+		# implicants covering it
+		minterms = sorted(remaining_minterms)
+		implicants = sorted(set(implicant for minterm in minterms for implicant in grouped_implicants[minterm]))
+		implicant_index = { implicant: index for (index, implicant) in enumerate(implicants) }
+		covers = [ 0 ] * len(implicants)
+		covering = [ 0 ] * len(minterms)
+		for (bit, minterm) in enumerate(minterms):
+			for implicant in grouped_implicants[minterm]:
+				index = implicant_index[implicant]
+				covers[index] |= 1 << bit
+				covering[bit] |= 1 << index
+
+		(essentials, rows, columns) = self._reduce_chart(covers, covering)
+		solution = set(implicants[index] for index in self._bits(essentials))
+		if self._verbose >= 2:
+			print(f"Secondary essential implicants: {sorted(solution)}")
+			print(f"Chart after dominance reduction: {rows.bit_count()} minterms, {columns.bit_count()} implicants")
+		if rows == 0:
+			return solution
+
+		# Search the remaining chart, renumbered to what is left of it
+		rows = list(self._bits(rows))
+		columns = list(self._bits(columns))
+		reduced_covers = [ sum(((covers[index] >> row) & 1) << bit for (bit, row) in enumerate(rows)) for index in columns ]
+		reduced_covering = [ sum(((covering[row] >> index) & 1) << position for (position, index) in enumerate(columns)) for row in rows ]
+		(cover, self._cover_minimal) = self._minimum_cover(reduced_covers, reduced_covering)
+		if not self._cover_minimal:
+			print(f"Warning: cover search stopped after {self._cover_budget} nodes, the result may not be minimal.", file = sys.stderr)
+		solution |= set(implicants[columns[position]] for position in cover)
+		return solution
 
 	def _format_implicant(self, implicant):
 		terms = [ ]
@@ -207,7 +431,7 @@ class QuineMcCluskey():
 		for (bit_count, implicants_by_mask) in sorted(implicants.items()):
 			for (mask, implicants) in sorted(implicants_by_mask.items()):
 				for implicant in implicants:
-					print(f"   [{implicant.mask:04x}] {bit_count:3d} {implicant.minterms}")
+					print(f"   [{implicant.mask:04x}] {bit_count:3d} {sorted(self._implicant_minterms(implicant))}")
 		print()
 
 	def _dump_eliminated_implicants(self, all_implicants, text):
@@ -217,13 +441,48 @@ class QuineMcCluskey():
 			else:
 				print(f"Eliminiated size {1 << (group - 1)} implicants {text}:")
 			for implicant in implicants:
-				print(f"    {implicant.minterms}")
+				print(f"    {sorted(self._implicant_minterms(implicant))}")
 			print()
 
-	def optimize(self):
-		expr_minterms = set(self._minterm2int(minterm) for minterm in self._expr.minterms())
+	def _lift_implicant(self, implicant, variables):
+		# The same cube over all variables of this expression: the variables
+		# it is not defined over are free.
+		var_count = len(self._expr.variables)
+		positions = { varname: var_count - 1 - varno for (varno, varname) in enumerate(self._expr.variables) }
+		(value, mask) = (0, (1 << var_count) - 1)
+		for (varno, varname) in enumerate(variables):
+			bit = len(variables) - 1 - varno
+			if ((implicant.mask >> bit) & 1) == 0:
+				mask &= ~(1 << positions[varname])
+				value |= ((implicant.value >> bit) & 1) << positions[varname]
+		return self.Implicant(value = value, mask = mask)
+
+	def _optimize_components(self, components):
+		# A minimal cover of an OR of functions over disjoint sets of
+		# variables consists of minimal covers of the individual functions,
+		# unless one of them is constant one. Constant zero components do not
+		# contribute any implicants.
+		solution = set()
+		for (component, ) in components:
+			qmc = QuineMcCluskey(component, verbosity = self._verbose, merge_strategy = self._merge_strategy, cover_budget = self._cover_budget)
+			implicants = qmc._minimal_implicants()
+			self._cover_minimal = self._cover_minimal and qmc._cover_minimal
+			lifted = set(self._lift_implicant(implicant, component.variables) for implicant in implicants)
+			if any(implicant.mask == (1 << len(self._expr.variables)) - 1 for implicant in lifted):
+				return lifted
+			solution |= lifted
+		return solution
+
+	def _minimal_implicants(self):
+		if self._dc_expr is None:
+			(op, components) = disjoint_components([ self._expr ])
+			if op == Operator.Or:
+				return self._optimize_components(components)
+
+		# Minterm indices use the first variable as the most significant bit.
+		expr_minterms = set(self._expr.minterm_indices())
 		if self._dc_expr is not None:
-			dc_minterms = set(self._minterm2int(minterm) for minterm in self._dc_expr.minterms())
+			dc_minterms = set(self._dc_expr.minterm_indices(self._expr.variables))
 		else:
 			dc_minterms = set()
 		if len(expr_minterms & dc_minterms) != 0:
@@ -234,8 +493,7 @@ class QuineMcCluskey():
 		prime_implicants = self._create_prime_implicants(grouped_minterms)
 		if len(prime_implicants) == 0:
 			# Constant zero function
-			print("0")
-			return 0
+			return set()
 
 		if self._verbose >= 2:
 			self._dump_implicants("Prime implicants", prime_implicants)
@@ -263,5 +521,10 @@ class QuineMcCluskey():
 		grouped_implicants = self._group_implicants_by_minterm(all_implicants)
 		optimal_solution = self._find_minimal_expression(remaining_minterms, grouped_implicants)
 
-		solution_implicants = set(required_implicants) | set(optimal_solution)
+		return set(required_implicants) | set(optimal_solution)
+
+	def optimize(self):
+		solution_implicants = self._minimal_implicants()
+		if len(solution_implicants) == 0:
+			return "0"
 		return " + ".join(self._format_implicant(implicant) for implicant in sorted(solution_implicants))
@@ -0,0 +1,351 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import heapq
+
+class SATSolver():
+	# Conflict-driven clause learning solver. Literals are given in DIMACS
+	# convention and internally coded as 2 * (variable - 1) + negated, so
+	# that the negation of a literal is its code XOR 1. Each clause is
+	# watched by its first two literals; the first literal of a reason
+	# clause is the one it implied. Conflicts are analyzed up to the first
+	# unique implication point, branching follows variable activities with
+	# saved phases, restarts follow the Luby sequence and learned clauses
+	# with a high literal block distance are periodically deleted.
+	_RESTART_BASE = 100
+	_VARIABLE_DECAY = 0.95
+	_LEARNT_GROWTH = 1.1
+
+	def __init__(self, variable_count = 0):
+		self._variable_count = 0
+		self._values = [ ]
+		self._level = [ ]
+		self._reason = [ ]
+		self._activity = [ ]
+		self._polarity = [ ]
+		self._seen = [ ]
+		self._watches = [ ]
+		self._clauses = [ ]
+		self._learnts = [ ]
+		self._lbd = { }
+		self._trail = [ ]
+		self._trail_lim = [ ]
+		self._qhead = 0
+		self._heap = [ ]
+		self._variable_increment = 1.0
+		self._max_learnts = 1000
+		self._unsatisfiable = False
+		self._model = None
+		self._conflicts = 0
+		self.add_variables(variable_count)
+
+	@property
+	def variable_count(self):
+		return self._variable_count
+
+	@property
+	def conflicts(self):
+		return self._conflicts
+
+	def add_variables(self, count):
+		for variable in range(self._variable_count, self._variable_count + count):
+			self._values += [ 0, 0 ]
+			self._level.append(0)
+			self._reason.append(None)
+			self._activity.append(0.0)
+			self._polarity.append(False)
+			self._seen.append(False)
+			self._watches += [ [ ], [ ] ]
+			heapq.heappush(self._heap, (0.0, variable))
+		self._variable_count += count
+
+	@staticmethod
+	def _code(literal):
+		return (2 * (abs(literal) - 1)) | (literal < 0)
+
+	@property
+	def _decision_level(self):
+		return len(self._trail_lim)
+
+	def _assign(self, literal, reason):
+		self._values[literal] = 1
+		self._values[literal ^ 1] = -1
+		variable = literal >> 1
+		self._level[variable] = len(self._trail_lim)
+		self._reason[variable] = reason
+		self._trail.append(literal)
+
+	def _attach(self, clause):
+		index = len(self._clauses)
+		self._clauses.append(clause)
+		self._watches[clause[0]].append(index)
+		self._watches[clause[1]].append(index)
+		return index
+
+	def add_clause(self, literals):
+		# Clauses may only be added at decision level zero, i.e., between
+		# calls to solve(). Literals already false at that level are dropped.
+		if self._unsatisfiable:
+			return
+		clause = [ ]
+		for code in set(self._code(literal) for literal in literals):
+			if (self._values[code] == 1) or ((code ^ 1) in clause):
+				return
+			elif self._values[code] == 0:
+				clause.append(code)
+		if len(clause) == 0:
+			self._unsatisfiable = True
+		elif len(clause) == 1:
+			self._assign(clause[0], None)
+			if self._propagate() is not None:
+				self._unsatisfiable = True
+		else:
+			self._attach(clause)
+
+	def _propagate(self):
+		values = self._values
+		clauses = self._clauses
+		watches = self._watches
+		trail = self._trail
+		while self._qhead < len(trail):
+			false_literal = trail[self._qhead] ^ 1
+			self._qhead += 1
+			watchers = watches[false_literal]
+			(i, j, count) = (0, 0, len(watchers))
+			while i < count:
+				index = watchers[i]
+				i += 1
+				clause = clauses[index]
+				if clause is None:
+					# Deleted learned clause
+					continue
+				if clause[0] == false_literal:
+					(clause[0], clause[1]) = (clause[1], false_literal)
+				first = clause[0]
+				if values[first] == 1:
+					watchers[j] = index
+					j += 1
+					continue
+
+				for k in range(2, len(clause)):
+					literal = clause[k]
+					if values[literal] != -1:
+						(clause[1], clause[k]) = (literal, false_literal)
+						watches[literal].append(index)
+						break
+				else:
+					watchers[j] = index
+					j += 1
+					if values[first] == -1:
+						while i < count:
+							watchers[j] = watchers[i]
+							(i, j) = (i + 1, j + 1)
+						del watchers[j:]
+						self._qhead = len(trail)
+						return index
+					self._assign(first, index)
+			del watchers[j:]
+		return None
+
+	def _bump(self, variable):
+		self._activity[variable] += self._variable_increment
+		if self._activity[variable] > 1e100:
+			self._activity = [ activity * 1e-100 for activity in self._activity ]
+			self._variable_increment *= 1e-100
+			self._heap = [ (-self._activity[variable], variable) for variable in range(self._variable_count) if self._values[2 * variable] == 0 ]
+			heapq.heapify(self._heap)
+		elif self._values[2 * variable] == 0:
+			heapq.heappush(self._heap, (-self._activity[variable], variable))
+
+	def _analyze(self, conflict):
+		# Resolve the conflicting clause with the reasons of literals of the
+		# current decision level until only one of them (the first unique
+		# implication point) remains. Its negation becomes the asserting
+		# first literal of the learned clause.
+		seen = self._seen
+		level = self._level
+		trail = self._trail
+		current_level = self._decision_level
+		learnt = [ None ]
+		pending = 0
+		position = len(trail) - 1
+		clause = self._clauses[conflict]
+		literal = None
+		while True:
+			for other in (clause if (literal is None) else clause[1:]):
+				variable = other >> 1
+				if (not seen[variable]) and (level[variable] > 0):
+					seen[variable] = True
+					self._bump(variable)
+					if level[variable] >= current_level:
+						pending += 1
+					else:
+						learnt.append(other)
+			while not seen[trail[position] >> 1]:
+				position -= 1
+			literal = trail[position]
+			position -= 1
+			seen[literal >> 1] = False
+			pending -= 1
+			if pending == 0:
+				break
+			clause = self._clauses[self._reason[literal >> 1]]
+		learnt[0] = literal ^ 1
+
+		# Drop literals that are implied by other literals of the clause
+		minimized = [ learnt[0] ]
+		for other in learnt[1:]:
+			reason = self._reason[other >> 1]
+			if (reason is None) or not all(seen[implied >> 1] or (level[implied >> 1] == 0) for implied in self._clauses[reason][1:]):
+				minimized.append(other)
+		for other in learnt[1:]:
+			seen[other >> 1] = False
+
+		# Second watch is the literal of the highest remaining level, which
+		# is also the level to backtrack to
+		if len(minimized) == 1:
+			backtrack_level = 0
+		else:
+			highest = max(range(1, len(minimized)), key = lambda i: level[minimized[i] >> 1])
+			(minimized[1], minimized[highest]) = (minimized[highest], minimized[1])
+			backtrack_level = level[minimized[1] >> 1]
+		lbd = len(set(level[other >> 1] for other in minimized))
+		return (minimized, backtrack_level, lbd)
+
+	def _backtrack(self, target_level):
+		if self._decision_level <= target_level:
+			return
+		start = self._trail_lim[target_level]
+		for literal in self._trail[start:]:
+			variable = literal >> 1
+			self._values[literal] = 0
+			self._values[literal ^ 1] = 0
+			self._reason[variable] = None
+			self._polarity[variable] = not (literal & 1)
+			heapq.heappush(self._heap, (-self._activity[variable], variable))
+		del self._trail[start:]
+		del self._trail_lim[target_level:]
+		self._qhead = start
+
+	def _pick_branch_variable(self):
+		while len(self._heap) > 0:
+			(activity, variable) = heapq.heappop(self._heap)
+			if (self._values[2 * variable] == 0) and (-activity == self._activity[variable]):
+				return variable
+		# Stale entries may have hidden unassigned variables
+		for variable in range(self._variable_count):
+			if self._values[2 * variable] == 0:
+				return variable
+		return None
+
+	def _reduce_learnts(self):
+		# Keep the better half of the learned clauses by literal block
+		# distance, as well as all clauses that currently are reasons
+		self._learnts = [ index for index in self._learnts if self._clauses[index] is not None ]
+		self._learnts.sort(key = lambda index: (self._lbd[index], len(self._clauses[index])))
+		keep = [ ]
+		for (rank, index) in enumerate(self._learnts):
+			clause = self._clauses[index]
+			locked = (self._reason[clause[0] >> 1] == index) and (self._values[clause[0]] == 1)
+			if (rank < len(self._learnts) // 2) or locked or (self._lbd[index] <= 2):
+				keep.append(index)
+			else:
+				self._clauses[index] = None
+				del self._lbd[index]
+		self._learnts = keep
+
+	@staticmethod
+	def _luby(index):
+		size = 1
+		sequence = 0
+		while size < index + 1:
+			sequence += 1
+			size = 2 * size + 1
+		while size - 1 != index:
+			size = (size - 1) >> 1
+			sequence -= 1
+			index %= size
+		return 1 << sequence
+
+	def solve(self, assumptions = None):
+		# Returns True if the clauses are satisfiable with all assumed
+		# literals being true. The satisfying assignment is then available
+		# via value(). Learned clauses are kept across calls.
+		self._model = None
+		if self._unsatisfiable:
+			return False
+		assumptions = [ self._code(literal) for literal in (assumptions or [ ]) ]
+		restarts = 0
+		restart_limit = self._RESTART_BASE * self._luby(restarts)
+		conflicts_since_restart = 0
+		while True:
+			conflict = self._propagate()
+			if conflict is not None:
+				self._conflicts += 1
+				conflicts_since_restart += 1
+				if self._decision_level == 0:
+					self._unsatisfiable = True
+					return False
+				(learnt, backtrack_level, lbd) = self._analyze(conflict)
+				self._backtrack(backtrack_level)
+				if len(learnt) == 1:
+					self._assign(learnt[0], None)
+				else:
+					index = self._attach(learnt)
+					self._learnts.append(index)
+					self._lbd[index] = lbd
+					self._assign(learnt[0], index)
+				self._variable_increment /= self._VARIABLE_DECAY
+				continue
+
+			if conflicts_since_restart >= restart_limit:
+				restarts += 1
+				restart_limit = self._RESTART_BASE * self._luby(restarts)
+				conflicts_since_restart = 0
+				self._backtrack(0)
+			if len(self._learnts) - len(self._trail) >= self._max_learnts:
+				self._reduce_learnts()
+				self._max_learnts = int(self._max_learnts * self._LEARNT_GROWTH)
+
+			decision = None
+			while self._decision_level < len(assumptions):
+				assumption = assumptions[self._decision_level]
+				if self._values[assumption] == 1:
+					# Already implied, open an empty decision level
+					self._trail_lim.append(len(self._trail))
+				elif self._values[assumption] == -1:
+					self._backtrack(0)
+					return False
+				else:
+					decision = assumption
+					break
+			if decision is None:
+				variable = self._pick_branch_variable()
+				if variable is None:
+					self._model = [ self._values[2 * variable] == 1 for variable in range(self._variable_count) ]
+					self._backtrack(0)
+					return True
+				decision = (2 * variable) | (not self._polarity[variable])
+			self._trail_lim.append(len(self._trail))
+			self._assign(decision, None)
+
+	def value(self, variable):
+		return self._model[variable - 1]
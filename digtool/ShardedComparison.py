@@ -0,0 +1,88 @@
+#	digtool - Tool to compute and simplify problems in digital systems
+#	Copyright (C) 2022-2022 Johannes Bauer
+#
+#	This file is part of digtool.
+#
+#	digtool is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	digtool is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with digtool; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import itertools
+import multiprocessing
+from .ExpressionParser import ParsedExpression
+
+_worker_state = None
+
+def _initialize_worker(sources, lowest_shard):
+	# Each worker compiles the straight-line code of both expressions once
+	global _worker_state
+	functions = [ ]
+	for source in sources:
+		namespace = { }
+		exec(compile(source, "<compiled expression>", "exec"), namespace)
+		functions.append(namespace["compiled_expression"])
+	_worker_state = (functions, lowest_shard)
+
+def _shard_difference(task):
+	# Lowest row index within the shard at which the expressions differ.
+	# Gives up (returning None) as soon as a lower shard has found one.
+	(shard, shard_bits, middle_bits, block_bits) = task
+	((lhs_fnc, rhs_fnc), lowest_shard) = _worker_state
+	row_count = 1 << block_bits
+	one = (1 << row_count) - 1
+	prefix_values = tuple(((shard >> (shard_bits - 1 - varno)) & 1) * one for varno in range(shard_bits))
+	low_vectors = tuple(ParsedExpression.variable_vector(block_bits - 1 - varno, row_count) for varno in range(block_bits))
+	for (blockno, middle_values) in enumerate(itertools.product((0, one), repeat = middle_bits)):
+		if lowest_shard.value < shard:
+			return None
+		difference = lhs_fnc(*prefix_values, *middle_values, *low_vectors, one = one) ^ rhs_fnc(*prefix_values, *middle_values, *low_vectors, one = one)
+		if difference != 0:
+			with lowest_shard.get_lock():
+				lowest_shard.value = min(lowest_shard.value, shard)
+			offset = ((shard << middle_bits) | blockno) << block_bits
+			return offset + (difference & -difference).bit_length() - 1
+	return None
+
+class ShardedComparison():
+	# Compares two expressions over the same variables on all rows, split
+	# into 2^k shards by the values of the k most significant variables
+	# which are evaluated by a pool of processes. Shards are handed out and
+	# collected in ascending order, so the first difference collected is
+	# the lowest one. A worker that finds a difference publishes its shard
+	# number so that all workers on higher shards stop early.
+	_SHARDS_PER_JOB = 4
+
+	def __init__(self, lhs, rhs, jobs, block_bits = 16):
+		assert(lhs.variables == rhs.variables)
+		self._lhs = lhs
+		self._rhs = rhs
+		self._jobs = jobs
+		self._block_bits = min(block_bits, len(lhs.variables))
+
+	def first_difference(self):
+		variables = self._lhs.variables
+		split_count = len(variables) - self._block_bits
+		shard_bits = min(split_count, (self._jobs * self._SHARDS_PER_JOB - 1).bit_length())
+		middle_bits = split_count - shard_bits
+		shard_count = 1 << shard_bits
+
+		sources = (self._lhs.compile_source(variables), self._rhs.compile_source(variables))
+		lowest_shard = multiprocessing.Value("q", shard_count)
+		with multiprocessing.Pool(self._jobs, initializer = _initialize_worker, initargs = (sources, lowest_shard)) as pool:
+			tasks = ((shard, shard_bits, middle_bits, self._block_bits) for shard in range(shard_count))
+			for index in pool.imap(_shard_difference, tasks):
+				if index is not None:
+					return index
+		return None
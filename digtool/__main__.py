@@ -20,6 +20,7 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 import sys
+import argparse
 from .ActionParse import ActionParse
 from .ActionTable import ActionTable
 from .ActionSynthesize import ActionSynthesize
@@ -30,22 +31,35 @@ from .ActionRandom import ActionRandom
 from .ActionDigitalTimingDiagram import ActionDigitalTimingDiagram
 from .MultiCommand import MultiCommand
 
+def positive_int(value):
+	try:
+		value = int(value)
+	except ValueError:
+		raise argparse.ArgumentTypeError(f"not an integer: {value!r}")
+	if value < 1:
+		raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+	return value
+
 def main():
 	mc = MultiCommand(description = "Tool to compute and simplify problems in digital systems", run_method = True)
 
 	def genparser(parser):
 		parser.add_argument("-n", "--no-implicit-and", action = "store_true", help = "By default, AND operations are implicity expressed (using a space character). This causes an actual operator to be emitted here.")
 		parser.add_argument("-f", "--format", choices = [ "text", "tex-tech", "tex-math", "internal" ], default = "text", help = "Print the expression in the desired format. Can be one of %(choices)s, defaults to %(default)s.")
+		parser.add_argument("-s", "--simplify", action = "store_true", help = "Algebraically simplify the expression after parsing, e.g., propagate constants and remove double negations, idempotent or absorbed operands. The set of variables is retained.")
 		parser.add_argument("-v", "--verbose", action = "count", default = 0, help = "Increase verbosity. Can be given multiple times.")
-		parser.add_argument("expression", help = "Input expression to parse")
+		parser.add_argument("expression", help = "Input expression to parse. Can also be '-' to read from stdin or '@filename' to read from a file.")
 	mc.register("parse", "Parse and reformat a Boolean expression", genparser, action = ActionParse)
 
 	def genparser(parser):
 		parser.add_argument("-z", "--kv-show-zeros", action = "store_true", help = "Show zeros explicitly in a KV map")
+		parser.add_argument("-o", "--only-ones", action = "store_true", help = "Only show the rows that evaluate to one. These are enumerated from a binary decision diagram without evaluating the whole table, so this also works for expressions with many variables.")
+		parser.add_argument("-g", "--gray-code", action = "store_true", help = "Enumerate the rows of the table in Gray code order, i.e., so that exactly one variable changes from one row to the next.")
 		parser.add_argument("-f", "--format", choices = [ "text", "table", "tex", "kv" ], default = "text", help = "Print the table in the desired format. Can be one of %(choices)s, defaults to %(default)s.")
+		parser.add_argument("-s", "--simplify", action = "store_true", help = "Algebraically simplify the expression after parsing, e.g., propagate constants and remove double negations, idempotent or absorbed operands. The set of variables is retained.")
 		parser.add_argument("-v", "--verbose", action = "count", default = 0, help = "Increase verbosity. Can be given multiple times.")
-		parser.add_argument("expression", help = "Input expression to create truth table from")
-		parser.add_argument("dc_expression", nargs = "?", help = "Optional expression that gives all don't care values")
+		parser.add_argument("expression", help = "Input expression to create truth table from. Can also be '-' to read from stdin or '@filename' to read from a file.")
+		parser.add_argument("dc_expression", nargs = "?", help = "Optional expression that gives all don't care values. Can also be '-' or '@filename'.")
 	mc.register("table", "Create a truth table for a Boolean expression", genparser, action = ActionTable)
 
 	def genparser(parser):
@@ -55,21 +69,31 @@ def main():
 	mc.register("synthesize", "Synthesize a Boolean expression from a given truth table", genparser, action = ActionSynthesize)
 
 	def genparser(parser):
+		parser.add_argument("-s", "--simplify", action = "store_true", help = "Algebraically simplify the expression after parsing, e.g., propagate constants and remove double negations, idempotent or absorbed operands. The set of variables is retained.")
 		parser.add_argument("-v", "--verbose", action = "count", default = 0, help = "Increase verbosity. Can be given multiple times.")
-		parser.add_argument("expression1", help = "Input expression 1")
-		parser.add_argument("expression2", help = "Input expression 2")
+		parser.add_argument("-m", "--method", choices = [ "table", "cofactor", "bdd", "sat" ], default = "table", help = "Method used to compare the expressions. \"table\" evaluates the whole truth table, \"cofactor\" recursively splits both expressions into cofactors and skips all subspaces in which they coincide, \"bdd\" compares binary decision diagrams of both expressions and works for many more variables, \"sat\" searches for a differing assignment with a SAT solver and also works for wide expressions whose decision diagrams get too large. Can be one of %(choices)s, defaults to %(default)s.")
+		parser.add_argument("-j", "--jobs", metavar = "count", type = positive_int, default = 1, help = "Number of processes that evaluate the truth table in parallel. Only supported by the \"table\" method. Defaults to %(default)d.")
+		parser.add_argument("-a", "--approximate", metavar = "count", type = positive_int, help = "Do not prove equality, but only compare the expressions on this many random inputs. If no difference is found, the fraction of inputs on which they could still differ is given with 95%% confidence. Useful for expressions too wide for any exact method.")
+		parser.add_argument("-r", "--random-seed", metavar = "seed", help = "Specify a custom seed for the random inputs with which differing expressions are detected early. Defaults to a fixed seed so that results are reproducible.")
+		parser.add_argument("-d", "--dimacs", metavar = "filename", help = "Write the miter of both expressions, i.e., a formula that is satisfiable exactly by the assignments for which they differ, to this file in DIMACS CNF format. The first variables of the file are the variables of the expressions in their order.")
+		parser.add_argument("expression1", help = "Input expression 1. Can also be '-' to read from stdin or '@filename' to read from a file.")
+		parser.add_argument("expression2", help = "Input expression 2. Can also be '-' to read from stdin or '@filename' to read from a file.")
 	mc.register("equal", "Comprare two Boolean expression for equality", genparser, action = ActionEqual)
 
 	def genparser(parser):
+		parser.add_argument("-s", "--simplify", action = "store_true", help = "Algebraically simplify the expression after parsing, e.g., propagate constants and remove double negations, idempotent or absorbed operands. The set of variables is retained.")
 		parser.add_argument("-v", "--verbose", action = "count", default = 0, help = "Increase verbosity. Can be given multiple times.")
-		parser.add_argument("expression", help = "Expression to minimize")
-		parser.add_argument("dc_expression", nargs = "?", help = "Optional expression that gives all don't care values")
+		parser.add_argument("-b", "--budget", metavar = "nodes", type = positive_int, help = "Stop the search for a minimum cover of the prime implicants after this many nodes and print the smallest cover found so far, with a warning that it may not be minimal. By default, the search runs until it has found a minimum cover, which can take long for functions with many minterms that several prime implicants cover alike.")
+		parser.add_argument("expression", help = "Expression to minimize. Can also be '-' to read from stdin or '@filename' to read from a file.")
+		parser.add_argument("dc_expression", nargs = "?", help = "Optional expression that gives all don't care values. Can also be '-' or '@filename'.")
 	mc.register("qmc", "Minimize a Boolean expression using the Quine-McCluskey method", genparser, action = ActionQMC)
 
 	def genparser(parser):
+		parser.add_argument("-m", "--method", choices = [ "table", "bdd" ], default = "table", help = "Method used to determine the terms. \"table\" evaluates the whole truth table, \"bdd\" walks the paths of a binary decision diagram and works for many more variables if there are few terms. Can be one of %(choices)s, defaults to %(default)s.")
 		parser.add_argument("-c", "--ccnf", action = "store_true", help = "By default, the canonical disjunctive normal form (CDNF) is generated. With this switch, the canonical conjunctive normal form (CCNF) is generated instead.")
+		parser.add_argument("-s", "--simplify", action = "store_true", help = "Algebraically simplify the expression after parsing, e.g., propagate constants and remove double negations, idempotent or absorbed operands. The set of variables is retained.")
 		parser.add_argument("-v", "--verbose", action = "count", default = 0, help = "Increase verbosity. Can be given multiple times.")
-		parser.add_argument("expression", help = "Input expression to canonicalize")
+		parser.add_argument("expression", help = "Input expression to canonicalize. Can also be '-' to read from stdin or '@filename' to read from a file.")
 	mc.register("canonicalize", "Canonicalize an expression into CDNF or CCNF", genparser, action = ActionCanonicalize)
 
 	def genparser(parser):